@@ -1,13 +1,22 @@
+import asyncio
 import logging
 import os
+import time
 from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import raiseload
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
-from data.models import get_db, create_tables, User, UserWord, LearningSession
-from data.repositories import MLDataService
-from exercises import ExerciseManager
+from telegram.ext import (
+    Application, CommandHandler, CallbackQueryHandler, MessageHandler, PicklePersistence, filters, ContextTypes
+)
+from data.models import SessionLocal, create_tables, User, UserWord, LearningSession
+from data.repositories import MLDataService, UserRepository
+from exercises import EXERCISE_CALLBACK_PREFIX, ExerciseManager
 from spaced_repetition import SpacedRepetitionManager
 from ml_models import LearningProgressPredictor, ContextualBandits
+from vocabulary_loader import VocabularyLoader
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,6 +26,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of newly recorded answers required before the ML models are retrained
+RETRAIN_MIN_NEW_SESSIONS = 10
+
+# Answers slower than this (seconds) are recorded without a response time
+MAX_RESPONSE_TIME = 600.0
+
+# Maximum number of queued bandit reward updates applied in one background batch
+ML_BATCH_SIZE = 32
+
+MAIN_MENU_TEXT = "I'll help you learn Dutch words using adaptive exercises and spaced repetition."
+
 class DutchVocabBot:
     """
     Main Telegram bot class for Dutch vocabulary training.
@@ -32,6 +52,42 @@ class DutchVocabBot:
         self.sr_manager = SpacedRepetitionManager()
         self.progress_predictor = LearningProgressPredictor()
         self.bandits = ContextualBandits()
+        self.vocabulary_loader = VocabularyLoader()
+
+        # Background ML worker state, created in post_init once the event loop is running
+        self._ml_queue: Optional[asyncio.Queue] = None
+        self._ml_worker_task: Optional[asyncio.Task] = None
+
+        # Static keyboards are built once and reused for every message
+        self.start_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("Next Word", callback_data="next_word")],
+            [InlineKeyboardButton("View Progress", callback_data="view_progress")],
+            [InlineKeyboardButton("Add Word", callback_data="add_word_menu")],
+        ])
+        self.main_menu_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("Next Word", callback_data="next_word")],
+            [InlineKeyboardButton("View Progress", callback_data="view_progress")],
+            [InlineKeyboardButton("Add Word", callback_data="add_word_menu")],
+            [InlineKeyboardButton("Remove Current Word", callback_data="remove_word")],
+        ])
+        self.result_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("Next Word", callback_data="next_word")],
+            [InlineKeyboardButton("Add Word", callback_data="add_word_menu")],
+            [InlineKeyboardButton("View Progress", callback_data="view_progress")],
+            [InlineKeyboardButton("Remove This Word", callback_data="remove_word")]
+        ])
+        self.progress_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("Next Word", callback_data="next_word")],
+            [InlineKeyboardButton("Main Menu", callback_data="back_to_menu")]
+        ])
+        self.word_removed_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("Next Word", callback_data="next_word")],
+            [InlineKeyboardButton("View Progress", callback_data="view_progress")],
+            [InlineKeyboardButton("Main Menu", callback_data="back_to_menu")]
+        ])
+        self.back_to_menu_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("Back to Menu", callback_data="back_to_menu")]
+        ])
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -51,38 +107,58 @@ class DutchVocabBot:
         if not user or not update.message:
             return
 
-        with next(get_db()) as db:
+        user_db_id = await asyncio.to_thread(self._register_user, user.id, user.username, user.first_name)
+
+        # Remember the internal user ID so answer handlers can skip the User lookup
+        self._uid_map(context)[user.id] = user_db_id
+
+        await update.message.reply_text(
+            f"Welcome to Dutch Vocabulary Trainer, {user.username}! 🇳🇱\n\n"
+            "I'll help you learn Dutch words using adaptive exercises and spaced repetition. You're always in learning mode - just hit 'Next Word' to continue!",
+            reply_markup=self.start_markup
+        )
+
+    def _register_user(self, telegram_id: int, username: Optional[str], first_name: Optional[str]) -> int:
+        """Create the user and seed default vocabulary on first contact (blocking); returns the internal ID"""
+        with SessionLocal() as db:
             # Check if user exists, create if new
-            db_user = db.query(User).filter(User.telegram_id == user.id).first()
+            db_user = UserRepository(db).get_by_telegram_id(telegram_id)
             if not db_user:
                 db_user = User(
-                    telegram_id=user.id,
-                    username=user.username,
-                    first_name=user.first_name
+                    telegram_id=telegram_id,
+                    username=username,
+                    first_name=first_name
                 )
                 db.add(db_user)
-                db.commit()
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Another update from this user registered them first (and seeds their vocabulary)
+                    db.rollback()
+                    return UserRepository(db).get_by_telegram_id(telegram_id).id
 
                 # Add default vocabulary for new user (95 Dutch words)
-                from vocabulary_loader import VocabularyLoader
-                loader = VocabularyLoader()
-                success, message = loader.add_default_vocabulary_for_user(db, user.id)
+                success, message = self.vocabulary_loader.add_default_vocabulary_for_user(db, telegram_id)
                 if success:
-                    print(f"Added default vocabulary for user {user.id}: {message}")
+                    print(f"Added default vocabulary for user {telegram_id}: {message}")
 
-        # Create main menu keyboard
-        keyboard = [
-            [InlineKeyboardButton("Next Word", callback_data="next_word")],
-            [InlineKeyboardButton("View Progress", callback_data="view_progress")],
-            [InlineKeyboardButton("Add Word", callback_data="add_word_menu")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+            return db_user.id
 
-        await update.message.reply_text(
-            f"Welcome to Dutch Vocabulary Trainer, {user.username}! 🇳🇱\n\n"
-            "I'll help you learn Dutch words using adaptive exercises and spaced repetition. You're always in learning mode - just hit 'Next Word' to continue!",
-            reply_markup=reply_markup
-        )
+    def _uid_map(self, context) -> dict:
+        """Telegram ID -> internal user ID cache kept in bot_data"""
+        return context.application.bot_data.setdefault('uid_map', {})
+
+    def _get_user_db_id(self, db, uid_map: dict, telegram_id: int) -> Optional[int]:
+        """Resolve the internal user ID for a Telegram user from uid_map or the database"""
+        # Read-only: uid_map lives in bot_data, which persistence copies on the event loop,
+        # so callers write the resolved ID back there after their await
+        user_db_id = uid_map.get(telegram_id)
+        if user_db_id is None:
+            user_db = UserRepository(db).get_by_telegram_id(telegram_id)
+            if not user_db:
+                return None
+            user_db_id = user_db.id
+        return user_db_id
 
     async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
@@ -97,8 +173,8 @@ class DutchVocabBot:
             await self.show_progress(query, context)
         elif query.data == "add_word_menu":
             await self.show_add_word_menu(query, context)
-        elif query.data.startswith("exercise_"):
-            await self.handle_exercise_response(query, context)
+        elif query.data.startswith(EXERCISE_CALLBACK_PREFIX):
+            await self.handle_exercise_response(query, context, query.data.removeprefix(EXERCISE_CALLBACK_PREFIX))
         elif query.data == "remove_word":
             await self.remove_current_word(query, context)
         elif query.data == "back_to_menu":
@@ -113,7 +189,7 @@ class DutchVocabBot:
         2. Use ContextualBandits ML to select optimal exercise type for the word
         3. Generate exercise (multiple choice or translation)
         4. Store exercise context for response handling
-        5. Track progress and retrain models every 10 words
+        5. Models are retrained once 10 new answers have been recorded
 
         The system adapts to user performance:
         - Words are scheduled using SM-2 spaced repetition algorithm
@@ -125,40 +201,55 @@ class DutchVocabBot:
 
         user_id = query.from_user.id
 
-        with next(get_db()) as db:
+        next_word, exercise_type, exercise_data, bandit_context = await asyncio.to_thread(
+            self._prepare_next_exercise, user_id
+        )
+
+        if not next_word:
+            await query.edit_message_text("No words to review right now! Check back later.")
+            return
+
+        # Store current exercise in context
+        context.user_data['current_word_id'] = next_word.id
+        context.user_data['current_exercise_type'] = exercise_type
+        # Wall-clock time: user_data is persisted, and a monotonic reading means nothing after a reboot
+        context.user_data['exercise_start_time'] = time.time()
+
+        # Store current word for potential removal
+        context.user_data['current_word_dutch'] = next_word.dutch_word
+        context.user_data['current_word_english'] = next_word.english_translation
+
+        # The expected answer is known now, so answer handlers never need to derive it again
+        context.user_data['current_correct_answer'] = exercise_data['correct_answer']
+
+        # The bandit context the exercise type was chosen in is reused for the reward update
+        context.user_data['current_bandit_context'] = bandit_context.tolist()
+
+        await query.edit_message_text(
+            exercise_data['question'],
+            reply_markup=exercise_data['keyboard']
+        )
+
+    def _prepare_next_exercise(self, user_id: int):
+        """Pick the next word and build its exercise (blocking); returns (word, type, exercise data, bandit context)"""
+        with SessionLocal() as db:
             # Get next word to review based on spaced repetition and ML predictions
             next_word = self.sr_manager.get_next_word_for_review(db, user_id, self.progress_predictor)
-
             if not next_word:
-                await query.edit_message_text("No words to review right now! Check back later.")
-                return
+                return None, None, None, None
 
-            # Get best exercise type using contextual bandits
+            # Get best exercise type using contextual bandits (ML data is keyed by the internal user ID)
             data_service = MLDataService(db)
-            exercise_type = self.bandits.select_exercise(data_service, user_id, next_word.id)
+            exercise_type, bandit_context = self.bandits.select_exercise_with_context(
+                data_service, next_word.user_id, next_word.id
+            )
 
             # Generate exercise
             exercise_data = self.exercise_manager.generate_exercise(db, next_word, exercise_type)
 
-            # Store current exercise in context
-            context.user_data['current_word_id'] = next_word.id
-            context.user_data['current_exercise_type'] = exercise_type
-            context.user_data['exercise_start_time'] = datetime.now()
-
-            # Store current word for potential removal
-            context.user_data['current_word_dutch'] = next_word.dutch_word
-            context.user_data['current_word_english'] = next_word.english_translation
-
-            # Initialize or increment word counter for model retraining
-            word_count = context.user_data.get('word_count', 0) + 1
-            context.user_data['word_count'] = word_count
-
-            await query.edit_message_text(
-                exercise_data['question'],
-                reply_markup=exercise_data['keyboard']
-            )
+            return next_word, exercise_type, exercise_data, bandit_context
 
-    async def handle_exercise_response(self, query, context):
+    async def handle_exercise_response(self, query, context, user_answer: str):
         if not query.from_user:
             return
 
@@ -166,8 +257,11 @@ class DutchVocabBot:
         word_id = context.user_data.get('current_word_id')
         exercise_type = context.user_data.get('current_exercise_type')
         start_time = context.user_data.get('exercise_start_time')
+        dutch_word = context.user_data.get('current_word_dutch')
+        english_translation = context.user_data.get('current_word_english')
+        correct_answer = context.user_data.get('current_correct_answer')
 
-        if not all([word_id, exercise_type, start_time]):
+        if not all([word_id, exercise_type, start_time, dutch_word, english_translation, correct_answer]):
             await query.edit_message_text("Session expired. Please start again.")
             return
 
@@ -175,126 +269,229 @@ class DutchVocabBot:
             await query.edit_message_text("Invalid session data. Please start again.")
             return
 
-        if not isinstance(start_time, datetime):
+        if not isinstance(start_time, float):
             await query.edit_message_text("Invalid session timing. Please start again.")
             return
 
-        response_time = (datetime.now() - start_time).total_seconds()
-        user_answer = query.data.replace("exercise_", "") if query.data else ""
-
-        with next(get_db()) as db:
-            user_word = db.query(UserWord).filter(UserWord.id == word_id).first()
-            if not user_word:
-                await query.edit_message_text("Word not found. Please start again.")
-                return
+        response_time = self._response_time(start_time)
 
-            is_correct = self.exercise_manager.check_answer(user_word, exercise_type, user_answer)
+        # The answer was stored when the exercise was shown, so no SELECT is needed to check it
+        is_correct = self.exercise_manager.check_answer_text(correct_answer, exercise_type, user_answer)
 
-            user_db = db.query(User).filter(User.telegram_id == user_id).first()
-            if not user_db:
-                await query.edit_message_text("User not found. Please start again.")
-                return
-
-            # Record learning session
-            session = LearningSession(
-                user_id=user_db.id,
-                user_word_id=word_id,
-                exercise_type=exercise_type,
-                is_correct=is_correct,
-                response_time=response_time,
-                timestamp=datetime.now()
-            )
-            db.add(session)
+        user_db_id, error = await asyncio.to_thread(
+            self._save_answer, self._uid_map(context), user_id, word_id, exercise_type, is_correct, response_time
+        )
+        if error:
+            await query.edit_message_text(error)
+            return
+        self._uid_map(context)[user_id] = user_db_id
+        self._queue_reward(
+            user_db_id, word_id, exercise_type, is_correct, response_time,
+            context.user_data.get('current_bandit_context')
+        )
 
-            # Update spaced repetition schedule (word_id is actually user_word_id)
-            self.sr_manager.update_word_schedule(db, user_id, word_id, is_correct)
+        # Retrain models in the background so the result is shown immediately
+        if self._should_retrain(context):
+            chat_id = query.message.chat_id if query.message else user_id
+            context.application.create_task(self._retrain(context, user_db_id, chat_id))
+
+        # Show result with word information
+        result_text = self._format_result(dutch_word, english_translation, correct_answer, is_correct)
+
+        await query.edit_message_text(result_text, reply_markup=self.result_markup)
+
+    def _response_time(self, start_time: float) -> Optional[float]:
+        """Seconds since the exercise was shown, or None if the clock reading cannot be trusted"""
+        response_time = time.time() - start_time
+        # A clock change, or an exercise left open across restarts, would skew the ML features
+        if not 0 <= response_time <= MAX_RESPONSE_TIME:
+            return None
+        return response_time
+
+    def _save_answer(
+        self, uid_map: dict, user_id: int, user_word_id: int, exercise_type: str, is_correct: bool,
+        response_time: Optional[float]
+    ) -> Tuple[Optional[int], Optional[str]]:
+        """Persist an answer (blocking); returns (internal user ID, None), or (None, error message) if not recorded"""
+        with SessionLocal() as db:
+            user_db_id = self._get_user_db_id(db, uid_map, user_id)
+            if not user_db_id:
+                return None, "User not found. Please start again."
+
+            if not self._record_answer(db, user_db_id, user_word_id, exercise_type, is_correct, response_time):
+                return None, "Word not found. Please start again."
+
+        return user_db_id, None
+
+    def _record_answer(
+        self, db, user_db_id: int, user_word_id: int, exercise_type: str, is_correct: bool,
+        response_time: Optional[float]
+    ) -> bool:
+        """
+        Record an answer and update the word's schedule and ML data in a single transaction.
 
-            # Update ML models data (always update response time and bandit rewards)
+        The session insert, SM-2 schedule update and response time average are flushed
+        together and committed once, instead of each step committing on its own.
+        Bandit reward updates are queued separately (see _queue_reward).
+        Returns False without recording anything if the word no longer exists.
+        """
+        # Load the word (scoped to its owner) once and hand the object to the SM-2 update
+        # Nothing below navigates relationships, so any lazy load would be an accidental extra query
+        user_word = db.query(UserWord).options(raiseload("*")).filter(
+            UserWord.id == user_word_id, UserWord.user_id == user_db_id
+        ).first()
+        if not user_word:
+            return False
+
+        # Update spaced repetition schedule
+        self.sr_manager.update_word_schedule_obj(db, user_word, is_correct)
+
+        # Sessions are an append-only log, so insert through Core and skip ORM object bookkeeping
+        db.execute(LearningSession.__table__.insert().values(
+            user_id=user_db_id,
+            user_word_id=user_word_id,
+            exercise_type=exercise_type,
+            is_correct=is_correct,
+            response_time=response_time,
+            timestamp=datetime.now()
+        ))
+
+        # Keep the user's running counters in step with the session log
+        db.execute(update(User).where(User.id == user_db_id).values(
+            total_answers=User.total_answers + 1,
+            correct_answers=User.correct_answers + int(is_correct)
+        ))
+
+        # Always update response time for progress tracking
+        if response_time:
+            MLDataService(db).user_word_repo.update_average_response_time(user_word, response_time)
+
+        db.commit()
+        return True
+
+    def _queue_reward(self, user_db_id: int, user_word_id: int, exercise_type: str, is_correct: bool,
+                      response_time: Optional[float], bandit_context: Optional[list] = None):
+        """Hand a bandit reward update (for the internal user ID) to the background ML worker"""
+        self._ml_queue.put_nowait((user_db_id, user_word_id, exercise_type, is_correct, response_time, bandit_context))
+
+    async def _ml_worker(self):
+        """Drain queued bandit rewards and apply them in batches on a worker thread"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._ml_queue.get()]
+            while len(batch) < ML_BATCH_SIZE and not self._ml_queue.empty():
+                batch.append(self._ml_queue.get_nowait())
+
+            try:
+                await loop.run_in_executor(None, self._apply_rewards, batch)
+            except Exception:
+                logger.exception("Failed to apply %d bandit reward updates", len(batch))
+            finally:
+                for _ in batch:
+                    self._ml_queue.task_done()
+
+    def _apply_rewards(self, batch: list):
+        """Apply a batch of bandit reward updates in one DB session (blocking)"""
+        with SessionLocal() as db:
             data_service = MLDataService(db)
-            # Always update response time for progress tracking
-            if session.response_time:
-                data_service.update_word_response_time(word_id, session.response_time)
-            # Always update bandit rewards for exercise type optimization
-            self.bandits.update_reward(data_service, user_id, word_id, exercise_type, is_correct, response_time)
-
-            # Check if we should retrain models (every 10 words)
-            word_count = context.user_data.get('word_count', 0)
-            if word_count > 0 and word_count % 10 == 0:
-                # Retrain progress predictor model
-                self.progress_predictor.train_model(data_service, user_id)
-                # Apply predictions to all user words
-                self.progress_predictor.apply_predictions_to_user_words(data_service, user_id)
-
+            for user_db_id, user_word_id, exercise_type, is_correct, response_time, bandit_context in batch:
+                self.bandits.update_reward(
+                    data_service, user_db_id, user_word_id, exercise_type, is_correct, response_time,
+                    context=bandit_context
+                )
             db.commit()
 
-            if word_count > 0 and word_count % 10 == 0:
-                # Send retraining notification
-                await query.edit_message_text("🧠 I just got better at suggesting you new words!")
-                # Small delay then continue
-                import asyncio
-                await asyncio.sleep(1.5)
-
-            # Show result with word information
-            correct_answer = user_word.english_translation if exercise_type.endswith('_to_en') else user_word.dutch_word
-            word_info = f"\n\n🇳🇱 {user_word.dutch_word} = 🇬🇧 {user_word.english_translation}"
-            result_text = ("✅ Correct!" if is_correct else f"❌ Incorrect. The answer was: {correct_answer}") + word_info
-
-            keyboard = [
-                [InlineKeyboardButton("Next Word", callback_data="next_word")],
-                [InlineKeyboardButton("Add Word", callback_data="add_word_menu")],
-                [InlineKeyboardButton("View Progress", callback_data="view_progress")],
-                [InlineKeyboardButton("Remove This Word", callback_data="remove_word")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-
-            # Check if we just showed retraining message
-            if word_count > 0 and word_count % 10 == 0:
-                # Show retraining message first, then the result
-                await query.edit_message_text("🧠 I just got better at suggesting you new words!")
-                import asyncio
-                await asyncio.sleep(1.5)
-                await query.edit_message_text(result_text, reply_markup=reply_markup)
-            else:
-                await query.edit_message_text(result_text, reply_markup=reply_markup)
+    async def post_init(self, application: Application):
+        """Start the background ML worker once the event loop is running"""
+        self._ml_queue = asyncio.Queue()
+        self._ml_worker_task = asyncio.create_task(self._ml_worker())
+
+    async def post_stop(self, application: Application):
+        """Let queued reward updates finish, then stop the ML worker"""
+        await self._ml_queue.join()
+        self._ml_worker_task.cancel()
+
+    def _format_result(self, dutch_word: str, english_translation: str, correct_answer: str, is_correct: bool) -> str:
+        """Build the answer feedback message shown after an exercise"""
+        word_info = f"\n\n🇳🇱 {dutch_word} = 🇬🇧 {english_translation}"
+        return ("✅ Correct!" if is_correct else f"❌ Incorrect. The answer was: {correct_answer}") + word_info
+
+    def _should_retrain(self, context) -> bool:
+        """Count a recorded answer and report whether enough new sessions arrived to retrain"""
+        new_sessions = context.user_data.get('sessions_since_train', 0) + 1
+        if new_sessions >= RETRAIN_MIN_NEW_SESSIONS:
+            context.user_data['sessions_since_train'] = 0
+            return True
+        context.user_data['sessions_since_train'] = new_sessions
+        return False
+
+    async def _retrain(self, context, user_db_id: int, chat_id: int):
+        """Retrain ML models for an internal user ID on a worker thread and notify the user once done"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._retrain_models, user_db_id)
+        await context.bot.send_message(chat_id, "🧠 I just got better at suggesting you new words!")
+
+    def _retrain_models(self, user_db_id: int):
+        """Retrain the progress predictor and apply fresh mastery predictions (blocking)"""
+        with SessionLocal() as db:
+            data_service = MLDataService(db)
+            self.progress_predictor.train_model(data_service, user_db_id)
+            self.progress_predictor.apply_predictions_to_user_words(data_service, user_db_id)
+            data_service.commit()
 
     async def show_progress(self, query, context):
-        keyboard = [
-                [InlineKeyboardButton("Next Word", callback_data="next_word")],
-                [InlineKeyboardButton("Main Menu", callback_data="back_to_menu")]
-            ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = self.progress_markup
 
         if not query.from_user:
             return
 
         user_id = query.from_user.id
 
-        with next(get_db()) as db:
-            user_db = db.query(User).filter(User.telegram_id == user_id).first()
-            if not user_db:
-                await query.edit_message_text("User not found. Please start again.", reply_markup=reply_markup)
-                return
+        user_db_id, stats = await asyncio.to_thread(self._load_progress_stats, self._uid_map(context), user_id)
+        if user_db_id is None:
+            await query.edit_message_text("User not found. Please start again.", reply_markup=reply_markup)
+            return
+        self._uid_map(context)[user_id] = user_db_id
+
+        total_sessions, correct_answers, avg_mastery_level = stats
+        if not total_sessions:
+            await query.edit_message_text("No learning sessions yet. Start learning to see your progress!", reply_markup=reply_markup)
+            return
+
+        accuracy = (correct_answers / total_sessions) * 100
+
+        progress_text = (
+            "📊 Your Progress:\n\n"
+            f"Total exercises: {total_sessions}\n"
+            f"Correct answers: {correct_answers}\n"
+            f"Accuracy: {accuracy:.1f}%\n"
+            f"Average Mastery: {avg_mastery_level:.1f}%\n"
+        )
 
-            sessions = db.query(LearningSession).filter(LearningSession.user_id == user_db.id).all()
+        await query.edit_message_text(progress_text, reply_markup=reply_markup)
 
-            words = db.query(UserWord).filter(UserWord.user_id == user_db.id).all()
+    def _load_progress_stats(
+        self, uid_map: dict, user_id: int
+    ) -> Tuple[Optional[int], Tuple[int, int, float]]:
+        """Load the internal user ID and (total sessions, correct answers, average mastery) (blocking)"""
+        with SessionLocal() as db:
+            user_db_id = self._get_user_db_id(db, uid_map, user_id)
+            if not user_db_id:
+                return None, (0, 0, 0.0)
 
-            if not sessions:
-                await query.edit_message_text("No learning sessions yet. Start learning to see your progress!", reply_markup=reply_markup)
-                return
+            # Answer counts are kept on the user row, so no scan of the session history is needed
+            total_sessions, correct_answers = db.query(
+                User.total_answers, User.correct_answers
+            ).filter(User.id == user_db_id).one()
 
-            total_sessions = len(sessions)
-            correct_answers = sum(1 for s in sessions if s.is_correct)
-            accuracy = (correct_answers / total_sessions) * 100 if total_sessions > 0 else 0
-            avg_mastery_level = sum(w.mastery_level for w in words) / len(words)
+            if not total_sessions:
+                return user_db_id, (0, 0, 0.0)
 
-            progress_text = "📊 Your Progress:\n\n"
-            progress_text += f"Total exercises: {total_sessions}\n"
-            progress_text += f"Correct answers: {correct_answers}\n"
-            progress_text += f"Accuracy: {accuracy:.1f}%\n"
-            progress_text += f"Average Mastery: {avg_mastery_level:.1f}%\n"
+            avg_mastery_level = db.query(func.avg(UserWord.mastery_level)).filter(
+                UserWord.user_id == user_db_id
+            ).scalar() or 0.0
 
-            await query.edit_message_text(progress_text, reply_markup=reply_markup)
+            return user_db_id, (total_sessions, correct_answers, avg_mastery_level)
 
     async def handle_text_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -321,8 +518,11 @@ class DutchVocabBot:
         current_word_id = context.user_data.get('current_word_id')
         exercise_type = context.user_data.get('current_exercise_type')
         start_time = context.user_data.get('exercise_start_time')
+        dutch_word = context.user_data.get('current_word_dutch')
+        english_translation = context.user_data.get('current_word_english')
+        correct_answer = context.user_data.get('current_correct_answer')
 
-        if not all([current_word_id, exercise_type, start_time]):
+        if not all([current_word_id, exercise_type, start_time, dutch_word, english_translation, correct_answer]):
             await update.message.reply_text("No active exercise. Use /start to begin learning!")
             return
 
@@ -334,84 +534,44 @@ class DutchVocabBot:
             await update.message.reply_text("Please use the buttons for multiple choice questions.")
             return
 
-        if not isinstance(start_time, datetime):
+        if not isinstance(start_time, float):
             await update.message.reply_text("Invalid session state. Please start again.")
             return
 
-        response_time = (datetime.now() - start_time).total_seconds()
+        response_time = self._response_time(start_time)
 
-        with next(get_db()) as db:
-            user_word = db.query(UserWord).filter(UserWord.id == current_word_id).first()
-            if not user_word:
-                await update.message.reply_text("Word not found. Please start again.")
-                return
-
-            is_correct = self.exercise_manager.check_answer(user_word, exercise_type, user_answer)
+        is_correct = self.exercise_manager.check_answer_text(correct_answer, exercise_type, user_answer)
 
-            user_db = db.query(User).filter(User.telegram_id == user_id).first()
-            if not user_db:
-                await update.message.reply_text("User not found. Please start again.")
-                return
-
-            # Record learning session
-            session = LearningSession(
-                user_id=user_db.id,
-                user_word_id=current_word_id,
-                exercise_type=exercise_type,
-                is_correct=is_correct,
-                response_time=response_time,
-                timestamp=datetime.now()
-            )
-            db.add(session)
+        user_db_id, error = await asyncio.to_thread(
+            self._save_answer, self._uid_map(context), user_id, current_word_id, exercise_type, is_correct,
+            response_time
+        )
+        if error:
+            await update.message.reply_text(error)
+            return
+        self._uid_map(context)[user_id] = user_db_id
+        self._queue_reward(
+            user_db_id, current_word_id, exercise_type, is_correct, response_time,
+            context.user_data.get('current_bandit_context')
+        )
 
-            # Update spaced repetition schedule
-            self.sr_manager.update_word_schedule(db, user_id, current_word_id, is_correct)
+        # Clear current exercise from context
+        if context.user_data:
+            context.user_data.pop('current_word_id', None)
+            context.user_data.pop('current_exercise_type', None)
+            context.user_data.pop('exercise_start_time', None)
+            context.user_data.pop('current_correct_answer', None)
+            context.user_data.pop('current_bandit_context', None)
 
-            # Update ML models data (always update response time and bandit rewards)
-            data_service = MLDataService(db)
-            # Always update response time for progress tracking
-            if session.response_time:
-                data_service.update_word_response_time(current_word_id, session.response_time)
-            # Always update bandit rewards for exercise type optimization
-            self.bandits.update_reward(data_service, user_id, current_word_id, exercise_type, is_correct, response_time)
-
-            # Check if we should retrain models (every 10 words)
-            word_count = context.user_data.get('word_count', 0)
-            if word_count > 0 and word_count % 10 == 0:
-                # Retrain progress predictor model
-                self.progress_predictor.train_model(data_service, user_id)
-                # Apply predictions to all user words
-                self.progress_predictor.apply_predictions_to_user_words(data_service, user_id)
+        # Show result with word information
+        result_text = self._format_result(dutch_word, english_translation, correct_answer, is_correct)
 
-            db.commit()
+        # Always show the result message for text input
+        await update.message.reply_text(result_text, reply_markup=self.result_markup)
 
-            # Clear current exercise from context
-            if context.user_data:
-                context.user_data.pop('current_word_id', None)
-                context.user_data.pop('current_exercise_type', None)
-                context.user_data.pop('exercise_start_time', None)
-
-            # Show result with word information
-            correct_answer = user_word.english_translation if exercise_type.endswith('_to_en') else user_word.dutch_word
-            word_info = f"\n\n🇳🇱 {user_word.dutch_word} = 🇬🇧 {user_word.english_translation}"
-            result_text = ("✅ Correct!" if is_correct else f"❌ Incorrect. The answer was: {correct_answer}") + word_info
-
-            keyboard = [
-                [InlineKeyboardButton("Next Word", callback_data="next_word")],
-                [InlineKeyboardButton("Add Word", callback_data="add_word_menu")],
-                [InlineKeyboardButton("View Progress", callback_data="view_progress")],
-                [InlineKeyboardButton("Remove This Word", callback_data="remove_word")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-
-            # Always show the result message for text input
-            await update.message.reply_text(result_text, reply_markup=reply_markup)
-
-            # Check if we should show retraining message after
-            if word_count > 0 and word_count % 10 == 0:
-                import asyncio
-                await asyncio.sleep(0.5)
-                await update.message.reply_text("🧠 I just got better at suggesting you new words!")
+        # Retrain models in the background
+        if self._should_retrain(context):
+            context.application.create_task(self._retrain(context, user_db_id, update.message.chat_id))
 
     async def add_word_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /add_word command to add custom vocabulary"""
@@ -428,15 +588,31 @@ class DutchVocabBot:
         dutch_word = context.args[0]
         english_translation = context.args[1]
 
-        from vocabulary_loader import VocabularyLoader
-        loader = VocabularyLoader()
-
         if not update.effective_user:
             return
 
-        with next(get_db()) as db:
-            success, message = loader.add_word(db, dutch_word, english_translation, user_telegram_id=update.effective_user.id)
-            await update.message.reply_text(f"{'✅' if success else '❌'} {message}")
+        user_id = update.effective_user.id
+        success, message, user_db_id = await asyncio.to_thread(
+            self._add_word, dutch_word, english_translation, user_id, self._uid_map(context)
+        )
+        if user_db_id:
+            self._uid_map(context)[user_id] = user_db_id
+        await update.message.reply_text(f"{'✅' if success else '❌'} {message}")
+
+    def _add_word(
+        self, dutch_word: str, english_translation: str, user_telegram_id: int, uid_map: dict
+    ) -> Tuple[bool, str, Optional[int]]:
+        """Add a word to the user's vocabulary, returning the resolved internal user ID (blocking)"""
+        with SessionLocal() as db:
+            success, message = self.vocabulary_loader.add_word(
+                db, dutch_word, english_translation, user_telegram_id=user_telegram_id
+            )
+            user_db_id = None
+            if success:
+                user_db_id = self._get_user_db_id(db, uid_map, user_telegram_id)
+                if user_db_id:
+                    self.exercise_manager.invalidate_distractor_pool(user_db_id)
+            return success, message, user_db_id
 
     async def show_add_word_menu(self, query, context):
         """Show add word menu with instructions"""
@@ -448,7 +624,7 @@ class DutchVocabBot:
             "• /add_word \"lopen\" \"to walk\"\n"
             "• /add_word \"mooi\" \"beautiful\"\n\n"
             "The word will be added to your personal vocabulary and you can start practicing it immediately!",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Back to Menu", callback_data="back_to_menu")]])
+            reply_markup=self.back_to_menu_markup
         )
 
     async def remove_current_word(self, query, context):
@@ -465,54 +641,52 @@ class DutchVocabBot:
             await query.edit_message_text("No current word to remove. Start learning first!")
             return
 
-        with next(get_db()) as db:
-            user_db = db.query(User).filter(User.telegram_id == user_id).first()
+        error = await asyncio.to_thread(self._remove_word, user_id, current_word_id)
+        if error:
+            await query.edit_message_text(error)
+            return
+
+        # Clear current word from context
+        if context.user_data:
+            context.user_data.pop('current_word_id', None)
+            context.user_data.pop('current_exercise_type', None)
+            context.user_data.pop('exercise_start_time', None)
+            context.user_data.pop('current_word_dutch', None)
+            context.user_data.pop('current_word_english', None)
+            context.user_data.pop('current_correct_answer', None)
+            context.user_data.pop('current_bandit_context', None)
+
+        await query.edit_message_text(
+            f"✅ Removed word: {dutch_word} ({english_word})",
+            reply_markup=self.word_removed_markup
+        )
+
+    def _remove_word(self, user_id: int, user_word_id: int) -> Optional[str]:
+        """Delete a word from the user's vocabulary (blocking); returns an error message on failure"""
+        with SessionLocal() as db:
+            user_db = UserRepository(db).get_by_telegram_id(user_id)
             if not user_db:
-                await query.edit_message_text("User not found.")
-                return
+                return "User not found."
 
             # Remove the word
-            user_word = db.query(UserWord).filter(UserWord.id == current_word_id).first()
-            if user_word:
-                db.delete(user_word)
-                db.commit()
-
-                # Clear current word from context
-                if context.user_data:
-                    context.user_data.pop('current_word_id', None)
-                    context.user_data.pop('current_exercise_type', None)
-                    context.user_data.pop('exercise_start_time', None)
-                    context.user_data.pop('current_word_dutch', None)
-                    context.user_data.pop('current_word_english', None)
-
-                keyboard = [
-                    [InlineKeyboardButton("Next Word", callback_data="next_word")],
-                    [InlineKeyboardButton("View Progress", callback_data="view_progress")],
-                    [InlineKeyboardButton("Main Menu", callback_data="back_to_menu")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-
-                await query.edit_message_text(
-                    f"✅ Removed word: {dutch_word} ({english_word})",
-                    reply_markup=reply_markup
-                )
-            else:
-                await query.edit_message_text("Word not found.")
+            user_word = db.get(UserWord, user_word_id)
+            if not user_word:
+                return "Word not found."
+
+            db.delete(user_word)
+            db.commit()
+            self.exercise_manager.invalidate_distractor_pool(user_word.user_id)
+
+        return None
 
     async def show_main_menu(self, query, context):
         """Show the main menu"""
-        keyboard = [
-            [InlineKeyboardButton("Next Word", callback_data="next_word")],
-            [InlineKeyboardButton("View Progress", callback_data="view_progress")],
-            [InlineKeyboardButton("Add Word", callback_data="add_word_menu")],
-            [InlineKeyboardButton("Remove Current Word", callback_data="remove_word")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        # If the message already shows the menu text, only the keyboard needs replacing
+        if query.message and query.message.text == MAIN_MENU_TEXT:
+            await query.edit_message_reply_markup(reply_markup=self.main_menu_markup)
+            return
 
-        await query.edit_message_text(
-            "I'll help you learn Dutch words using adaptive exercises and spaced repetition.",
-            reply_markup=reply_markup
-        )
+        await query.edit_message_text(MAIN_MENU_TEXT, reply_markup=self.main_menu_markup)
 
 def main():
     create_tables()
@@ -521,14 +695,26 @@ def main():
     if not token:
         raise ValueError("TELEGRAM_BOT_TOKEN environment variable is required")
 
-    application = Application.builder().token(token).build()
+    # Keep user_data/bot_data (current exercise, word counters, user ID cache) across restarts
+    persistence = PicklePersistence(filepath=os.getenv("BOT_STATE_FILE", "bot_state.pkl"))
 
     bot = DutchVocabBot()
 
+    # Process updates from different users concurrently instead of one at a time
+    application = (
+        Application.builder()
+        .token(token)
+        .persistence(persistence)
+        .concurrent_updates(32)
+        .post_init(bot.post_init)
+        .post_stop(bot.post_stop)
+        .build()
+    )
+
     application.add_handler(CommandHandler("start", bot.start))
     application.add_handler(CommandHandler("add_word", bot.add_word_command))
-    application.add_handler(CallbackQueryHandler(bot.button_handler))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, bot.handle_text_input))
+    application.add_handler(CallbackQueryHandler(bot.button_handler, block=False))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, bot.handle_text_input, block=False))
 
     application.run_polling()
 
@@ -1,4 +1,7 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Boolean, ForeignKey, Text
+from sqlalchemy import (
+    create_engine, event, inspect, make_url, text,
+    Column, Integer, String, DateTime, Float, Boolean, ForeignKey, Index, Text
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime, timedelta
@@ -8,8 +11,33 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///dutch_vocab.db")
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+# SQLite connections are handed between threads by the pool, so disable the same-thread check
+connect_args = {"check_same_thread": False} if IS_SQLITE else {}
+# In-memory SQLite uses SingletonThreadPool, which takes no QueuePool sizing
+IS_MEMORY_SQLITE = IS_SQLITE and make_url(DATABASE_URL).database in (None, "", ":memory:")
+pool_args = {} if IS_MEMORY_SQLITE else {"pool_size": 20, "max_overflow": 40}
+engine = create_engine(
+    DATABASE_URL,
+    # A local SQLite file never drops connections, so only ping remote databases
+    pool_pre_ping=not IS_SQLITE,
+    connect_args=connect_args,
+    **pool_args,
+)
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL avoids an fsync per commit and lets readers run alongside the writer
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-20000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
 class User(Base):
@@ -20,6 +48,10 @@ class User(Base):
     username = Column(String, nullable=True)
     first_name = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Running answer counters, bumped with every recorded session so progress is a single-row read
+    total_answers = Column(Integer, default=0)
+    correct_answers = Column(Integer, default=0)
     
     learning_sessions = relationship("LearningSession", back_populates="user")
 
@@ -53,6 +85,15 @@ class UserWord(Base):
     
     user = relationship("User", backref="words")
 
+    __table_args__ = (
+        # Serves the spaced-repetition "next due word" lookup in its full ORDER BY, and any other per-user scan
+        Index("ix_user_words_user_active_due_mastery", "user_id", "is_active", "next_review_date", "mastery_level"),
+        # Serves the "words seen at least once" scan that builds progress training data
+        Index("ix_user_words_user_seen", "user_id", "times_seen"),
+        # One row per word in a user's vocabulary; lets default-vocabulary seeding skip duplicates in the INSERT
+        Index("ux_user_words_user_dutch_word", "user_id", "dutch_word", unique=True),
+    )
+
 class LearningSession(Base):
     __tablename__ = "learning_sessions"
     
@@ -65,8 +106,13 @@ class LearningSession(Base):
     confidence_score = Column(Float, default=0.5)  # 0-1 scale
     timestamp = Column(DateTime, default=datetime.utcnow)
     
-    user = relationship("User", back_populates="learning_sessions")
-    user_word = relationship("UserWord", backref="learning_sessions")
+    # Nothing navigates from a session to its user or word; raise instead of silently lazy-loading
+    user = relationship("User", back_populates="learning_sessions", lazy="raise")
+    user_word = relationship("UserWord", backref="learning_sessions", lazy="raise")
+
+    __table_args__ = (
+        Index("ix_learning_sessions_user_timestamp", "user_id", "timestamp"),
+    )
 
 class BanditModel(Base):
     __tablename__ = "bandit_models"
@@ -83,8 +129,56 @@ class BanditModel(Base):
     
     user = relationship("User", backref="bandit_models")
 
+def add_user_answer_counters():
+    """Add and backfill the User answer counters on databases created before they existed"""
+    existing = {column["name"] for column in inspect(engine).get_columns("users")}
+    if "total_answers" in existing:
+        return
+
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE users ADD COLUMN total_answers INTEGER DEFAULT 0"))
+        conn.execute(text("ALTER TABLE users ADD COLUMN correct_answers INTEGER DEFAULT 0"))
+        conn.execute(text(
+            "UPDATE users SET "
+            "total_answers = (SELECT COUNT(*) FROM learning_sessions WHERE learning_sessions.user_id = users.id), "
+            "correct_answers = (SELECT COALESCE(SUM(CASE WHEN is_correct THEN 1 ELSE 0 END), 0) "
+            "FROM learning_sessions WHERE learning_sessions.user_id = users.id)"
+        ))
+
+def merge_duplicate_user_words():
+    """Keep the oldest row of each (user_id, dutch_word) so the unique index can be built on older databases"""
+    existing = {index["name"] for index in inspect(engine).get_indexes("user_words")}
+    if "ux_user_words_user_dutch_word" in existing:
+        return
+
+    # A duplicate is any row with a lower id for the same user and word
+    is_duplicate = (
+        "id > (SELECT MIN(kept.id) FROM user_words kept "
+        "WHERE kept.user_id = user_words.user_id AND kept.dutch_word = user_words.dutch_word)"
+    )
+    with engine.begin() as conn:
+        # Point the duplicates' sessions at the kept row before deleting them
+        conn.execute(text(
+            "UPDATE learning_sessions SET user_word_id = ("
+            "SELECT MIN(kept.id) FROM user_words kept JOIN user_words duplicate "
+            "ON kept.user_id = duplicate.user_id AND kept.dutch_word = duplicate.dutch_word "
+            "WHERE duplicate.id = learning_sessions.user_word_id) "
+            f"WHERE user_word_id IN (SELECT id FROM user_words WHERE {is_duplicate})"
+        ))
+        conn.execute(text(f"DELETE FROM user_words WHERE {is_duplicate}"))
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    merge_duplicate_user_words()
+    # create_all skips tables that already exist, so add indexes declared after a table was created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    add_user_answer_counters()
+    if IS_SQLITE:
+        # Refresh planner statistics so SQLite picks up the composite indexes
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
 
 def get_db():
     db = SessionLocal()
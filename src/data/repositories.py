@@ -5,13 +5,31 @@ This module provides repositories to decouple ML models from direct database acc
 making the code more testable and maintainable.
 """
 
-from typing import Any, Dict, List, Optional
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import and_
+import numpy as np
+from sqlalchemy import and_, bindparam, case, func, select, update
 from sqlalchemy.orm import Session
 
 from data.models import BanditModel, LearningSession, User, UserWord
 
+# Built once so every user lookup reuses the same statement (and its compiled-SQL cache entry)
+_USER_BY_TELEGRAM_ID = select(User).where(User.telegram_id == bindparam("telegram_id"))
+
+
+@lru_cache(maxsize=1024)
+def _parse_model_params(
+    coefficients: str, scaler_mean: str, scaler_scale: str
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Parse stored bandit parameters once per distinct saved JSON (the blobs themselves are the cache key)"""
+    arrays = tuple(np.array(json.loads(blob)) for blob in (coefficients, scaler_mean, scaler_scale))
+    # The arrays are shared between callers through the cache, so guard them against mutation
+    for array in arrays:
+        array.flags.writeable = False
+    return arrays
+
 
 class UserWordRepository:
     """Repository for UserWord data access"""
@@ -20,8 +38,8 @@ class UserWordRepository:
         self.db = db
 
     def get_by_id(self, user_word_id: int) -> Optional[UserWord]:
-        """Get a user word by ID"""
-        return self.db.query(UserWord).filter(UserWord.id == user_word_id).first()
+        """Get a user word by ID (served from the session's identity map when already loaded)"""
+        return self.db.get(UserWord, user_word_id)
 
     def get_user_words_with_sessions(self, user_id: int) -> List[UserWord]:
         """Get all user words that have been seen at least once"""
@@ -38,21 +56,17 @@ class UserWordRepository:
 
     def update_mastery_level(self, user_word_id: int, mastery_level: float):
         """Update the mastery level for a user word"""
-        user_word = self.get_by_id(user_word_id)
-        if user_word:
-            user_word.mastery_level = mastery_level
+        self.db.execute(update(UserWord).where(UserWord.id == user_word_id).values(mastery_level=mastery_level))
 
-    def update_average_response_time(self, user_word_id: int, response_time: float, alpha: float = 0.3):
-        """Update average response time using exponential moving average"""
-        user_word = self.get_by_id(user_word_id)
-        if user_word:
-            if user_word.average_response_time.is_(0):
-                user_word.average_response_time = response_time
-            else:
-                user_word.average_response_time = (
-                    alpha * response_time +
-                    (1 - alpha) * user_word.average_response_time
-                )
+    def update_average_response_time(self, user_word: UserWord, response_time: float, alpha: float = 0.3):
+        """Update an already loaded user word's average response time using exponential moving average"""
+        if not user_word.average_response_time:
+            user_word.average_response_time = response_time
+        else:
+            user_word.average_response_time = (
+                alpha * response_time +
+                (1 - alpha) * user_word.average_response_time
+            )
 
 
 class LearningSessionRepository:
@@ -71,10 +85,21 @@ class LearningSessionRepository:
         ).order_by(LearningSession.timestamp).all()
 
     def get_user_sessions(self, user_id: int) -> List[LearningSession]:
-        """Get all sessions for a user"""
+        """Get all sessions for a user, oldest first"""
         return self.db.query(LearningSession).filter(
             LearningSession.user_id == user_id
-        ).all()
+        ).order_by(LearningSession.timestamp).all()
+
+    def get_accuracy_by_exercise_type(self, user_id: int) -> Dict[str, Tuple[int, int]]:
+        """Get (total, correct) session counts per exercise type for a user in one query"""
+        rows = self.db.query(
+            LearningSession.exercise_type,
+            func.count(LearningSession.id),
+            func.sum(case((LearningSession.is_correct, 1), else_=0))
+        ).filter(
+            LearningSession.user_id == user_id
+        ).group_by(LearningSession.exercise_type).all()
+        return {exercise_type: (total, correct or 0) for exercise_type, total, correct in rows}
 
     def get_exercise_type_sessions(self, user_id: int, exercise_type: str) -> List[LearningSession]:
         """Get all sessions for a specific user and exercise type"""
@@ -101,6 +126,16 @@ class BanditModelRepository:
             )
         ).first()
 
+    def get_models(self, user_id: int, exercise_types: List[str]) -> Dict[str, BanditModel]:
+        """Get a user's bandit models for several exercise types in one query"""
+        bandit_models = self.db.query(BanditModel).filter(
+            and_(
+                BanditModel.user_id == user_id,
+                BanditModel.exercise_type.in_(exercise_types)
+            )
+        ).all()
+        return {bandit_model.exercise_type: bandit_model for bandit_model in bandit_models}
+
     def save_model(self, user_id: int, exercise_type: str, model_data: Dict[str, Any]) -> BanditModel:
         """Save or update a bandit model"""
         bandit_model = self.get_model(user_id, exercise_type)
@@ -120,24 +155,38 @@ class BanditModelRepository:
         bandit_model.is_trained = model_data['is_trained']
         bandit_model.updated_at = model_data['updated_at']
 
-        self.db.commit()
+        # Flush so a later lookup in this session sees the row; the caller commits
+        self.db.flush()
         return bandit_model
 
     def load_model_data(self, user_id: int, exercise_type: str) -> Optional[Dict[str, Any]]:
         """Load model data as a dictionary"""
-        bandit_model = self.get_model(user_id, exercise_type)
-
-        _a: int = len(exercise_type)
-
+        return self._to_model_data(self.get_model(user_id, exercise_type))
+
+    def load_models_data(self, user_id: int, exercise_types: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Load the trained models for several exercise types with a single query"""
+        models_data = {}
+        for exercise_type, bandit_model in self.get_models(user_id, exercise_types).items():
+            model_data = self._to_model_data(bandit_model)
+            if model_data:
+                models_data[exercise_type] = model_data
+        return models_data
+
+    def _to_model_data(self, bandit_model: Optional[BanditModel]) -> Optional[Dict[str, Any]]:
+        """Convert a trained model row to a dictionary of parsed parameters"""
         if not bandit_model or not bandit_model.is_trained:
             return None
         try:
-            import json
+            coefficients, scaler_mean, scaler_scale = _parse_model_params(
+                bandit_model.model_coefficients,
+                bandit_model.scaler_mean,
+                bandit_model.scaler_scale,
+            )
             return {
-                'coefficients': json.loads(bandit_model.model_coefficients),
+                'coefficients': coefficients,
                 'intercept': bandit_model.model_intercept,
-                'scaler_mean': json.loads(bandit_model.scaler_mean),
-                'scaler_scale': json.loads(bandit_model.scaler_scale),
+                'scaler_mean': scaler_mean,
+                'scaler_scale': scaler_scale,
                 'is_trained': bandit_model.is_trained
             }
         except Exception as e:
@@ -153,15 +202,21 @@ class UserRepository:
 
     def get_by_telegram_id(self, telegram_id: int) -> Optional[User]:
         """Get user by Telegram ID"""
-        return self.db.query(User).filter(User.telegram_id == telegram_id).first()
+        return self.db.execute(_USER_BY_TELEGRAM_ID, {"telegram_id": telegram_id}).scalar_one_or_none()
 
     def get_by_id(self, user_id: int) -> Optional[User]:
-        """Get user by internal ID"""
-        return self.db.query(User).filter(User.id == user_id).first()
+        """Get user by internal ID (served from the session's identity map when already loaded)"""
+        return self.db.get(User, user_id)
 
 
 class MLDataService:
-    """Service that combines repositories for ML operations"""
+    """
+    Service that combines repositories for ML operations.
+
+    A service instance is meant to live for a single request or retraining run: session
+    reads are memoized on the instance, so sessions recorded afterwards are not visible
+    through it. Create a new service to pick them up.
+    """
 
     def __init__(self, db: Session):
         self.db = db
@@ -170,6 +225,25 @@ class MLDataService:
         self.bandit_repo = BanditModelRepository(db)
         self.user_repo = UserRepository(db)
 
+        self._user_sessions_cache: Dict[int, List[LearningSession]] = {}
+        self._word_sessions_cache: Dict[int, Dict[int, List[LearningSession]]] = {}
+        self._prediction_data_cache: Dict[Tuple[int, int], Optional[Dict[str, Any]]] = {}
+
+    def get_user_sessions(self, user_id: int) -> List[LearningSession]:
+        """Get all sessions for a user, memoized for the lifetime of this service"""
+        if user_id not in self._user_sessions_cache:
+            self._user_sessions_cache[user_id] = self.session_repo.get_user_sessions(user_id)
+        return self._user_sessions_cache[user_id]
+
+    def get_word_sessions(self, user_id: int, user_word_id: int) -> List[LearningSession]:
+        """Get a word's sessions (oldest first) by grouping the user's memoized sessions"""
+        if user_id not in self._word_sessions_cache:
+            sessions_by_word: Dict[int, List[LearningSession]] = {}
+            for session in self.get_user_sessions(user_id):
+                sessions_by_word.setdefault(session.user_word_id, []).append(session)
+            self._word_sessions_cache[user_id] = sessions_by_word
+        return self._word_sessions_cache[user_id].get(user_word_id, [])
+
     def get_word_training_data(self, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get training data for progress prediction model"""
         if user_id:
@@ -179,9 +253,10 @@ class MLDataService:
             user_words = self.db.query(UserWord).filter(UserWord.times_seen > 0).all()
 
         training_data = []
+        # One session query per user; each word's sessions are grouped out of that result
         for user_word in user_words:
-            word_sessions = self.session_repo.get_word_sessions(user_word.user_id, user_word.id)
-            user_sessions = self.session_repo.get_user_sessions(user_word.user_id)
+            word_sessions = self.get_word_sessions(user_word.user_id, user_word.id)
+            user_sessions = self.get_user_sessions(user_word.user_id)
 
             training_data.append({
                 'user_word': user_word,
@@ -194,27 +269,39 @@ class MLDataService:
 
     def get_word_prediction_data(self, user_id: int, user_word_id: int) -> Optional[Dict[str, Any]]:
         """Get data needed for making a prediction on a single word"""
+        key = (user_id, user_word_id)
+        if key in self._prediction_data_cache:
+            return self._prediction_data_cache[key]
+
         user_word = self.user_word_repo.get_by_id(user_word_id)
         if not user_word:
-            return None
-
-        word_sessions = self.session_repo.get_word_sessions(user_id, user_word_id)
-        user_sessions = self.session_repo.get_user_sessions(user_id)
+            prediction_data = None
+        else:
+            prediction_data = {
+                'user_word': user_word,
+                'word_sessions': self.get_word_sessions(user_id, user_word_id),
+                'user_sessions': self.get_user_sessions(user_id)
+            }
 
-        return {
-            'user_word': user_word,
-            'word_sessions': word_sessions,
-            'user_sessions': user_sessions
-        }
+        self._prediction_data_cache[key] = prediction_data
+        return prediction_data
 
     def apply_mastery_predictions(self, user_id: int, predictions: Dict[int, float]):
         """Apply mastery predictions to user words"""
-        for user_word_id, mastery_level in predictions.items():
-            self.user_word_repo.update_mastery_level(user_word_id, mastery_level)
-
-        self.db.commit()
+        if predictions:
+            # ORM bulk UPDATE by primary key: one executemany instead of a SELECT and UPDATE per word
+            self.db.execute(
+                update(UserWord),
+                [{'id': user_word_id, 'mastery_level': mastery_level}
+                 for user_word_id, mastery_level in predictions.items()]
+            )
 
     def update_word_response_time(self, user_word_id: int, response_time: float):
         """Update average response time for a word"""
-        self.user_word_repo.update_average_response_time(user_word_id, response_time)
+        user_word = self.user_word_repo.get_by_id(user_word_id)
+        if user_word:
+            self.user_word_repo.update_average_response_time(user_word, response_time)
+
+    def commit(self):
+        """Commit the writes above in one transaction (they never commit on their own)"""
         self.db.commit()
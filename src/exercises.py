@@ -1,11 +1,25 @@
 import random
-from typing import Any, Dict
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 from data.models import UserWord
 
+# A leading Dutch article, which a typed answer may include or leave out
+ARTICLE_PATTERN = re.compile(r"^(?:de|het)\s+")
+
+# How long a user's distractor pool is reused before it is read from the database again (seconds)
+DISTRACTOR_POOL_TTL = 30.0
+
+# Callback data of a multiple-choice option is this prefix followed by the option text
+EXERCISE_CALLBACK_PREFIX = "exercise_"
+
 
 class ExerciseManager:
     def __init__(self):
@@ -15,47 +29,49 @@ class ExerciseManager:
             "translation_en_to_nl",
             "translation_nl_to_en",
         ]
+        # exercise type -> generator(db, word); unknown types fall back to multiple_choice_en_to_nl
+        self._generators = {
+            "multiple_choice_en_to_nl": lambda db, word: self._generate_multiple_choice(db, word, "en_to_nl"),
+            "multiple_choice_nl_to_en": lambda db, word: self._generate_multiple_choice(db, word, "nl_to_en"),
+            "translation_en_to_nl": lambda db, word: self._generate_translation(word, "en_to_nl"),
+            "translation_nl_to_en": lambda db, word: self._generate_translation(word, "nl_to_en"),
+        }
+        # user_id -> (loaded at, [(id, dutch_word, english_translation), ...]) of candidate wrong answers,
+        # least recently used first; exercises are generated from executor threads, hence the lock
+        self.max_cached_users = 1000  # Users whose distractor pool is kept in memory, least recently used dropped
+        self._pool_cache: "OrderedDict[int, Tuple[float, List[Tuple[int, str, str]]]]" = OrderedDict()
+        self._pool_lock = threading.Lock()
 
     def generate_exercise(self, db: Session, user_word: UserWord, exercise_type: str) -> Dict[str, Any]:
-        if exercise_type == "multiple_choice_en_to_nl":
-            return self._generate_multiple_choice(db, user_word, "en_to_nl")
-        elif exercise_type == "multiple_choice_nl_to_en":
-            return self._generate_multiple_choice(db, user_word, "nl_to_en")
-        elif exercise_type == "translation_en_to_nl":
-            return self._generate_translation(user_word, "en_to_nl")
-        elif exercise_type == "translation_nl_to_en":
-            return self._generate_translation(user_word, "nl_to_en")
-        else:
-            return self._generate_multiple_choice(db, user_word, "en_to_nl")
+        generator = self._generators.get(exercise_type, self._generators["multiple_choice_en_to_nl"])
+        return generator(db, user_word)
 
     def _generate_multiple_choice(self, db: Session, correct_word: UserWord, direction: str) -> Dict[str, Any]:
         # Get 3 random wrong answers from the same user's vocabulary
-        wrong_words = (
-            db.query(UserWord)
-            .filter(
-                UserWord.user_id == correct_word.user_id, UserWord.id != correct_word.id, UserWord.is_active == True
-            )
-            .limit(50)
-            .all()
-        )
+        wrong_words = [w for w in self._get_distractor_pool(db, correct_word.user_id) if w[0] != correct_word.id][:50]
 
-        if len(wrong_words) < 3:
+        if len(wrong_words) >= 3:
+            wrong_options = random.sample(wrong_words, 3)
+        else:
             # If user doesn't have enough words, fall back to global vocabulary
             # This shouldn't happen in practice since we have 95 default words
-            wrong_words = (
-                db.query(UserWord).filter(UserWord.id != correct_word.id, UserWord.is_active == True).limit(50).all()
+            # (the database picks the 3 random rows, so only those are fetched)
+            wrong_options = (
+                db.query(UserWord.id, UserWord.dutch_word, UserWord.english_translation)
+                .filter(UserWord.id != correct_word.id, UserWord.is_active == True)
+                .order_by(func.random())
+                .limit(3)
+                .all()
             )
 
-        wrong_options = random.sample(wrong_words, min(3, len(wrong_words)))
-
         if direction == "en_to_nl":
             question = f"What is the Dutch translation of '{correct_word.english_translation}'?"
             correct_answer = correct_word.dutch_word
-            wrong_answers = [w.dutch_word for w in wrong_options]
+            wrong_answers = [dutch_word for _, dutch_word, _ in wrong_options]
         else:  # nl_to_en
             question = f"What is the English translation of '{correct_word.dutch_word}'?"
             correct_answer = correct_word.english_translation
-            wrong_answers = [w.english_translation for w in wrong_options]
+            wrong_answers = [english_translation for _, _, english_translation in wrong_options]
 
         # Create options list and shuffle
         options = [correct_answer] + wrong_answers
@@ -64,11 +80,41 @@ class ExerciseManager:
         # Create keyboard
         keyboard = []
         for option in options:
-            callback_data = f"exercise_{option}"
+            callback_data = f"{EXERCISE_CALLBACK_PREFIX}{option}"
             keyboard.append([InlineKeyboardButton(option, callback_data=callback_data)])
 
         return {"question": question, "keyboard": InlineKeyboardMarkup(keyboard), "correct_answer": correct_answer}
 
+    def _get_distractor_pool(self, db: Session, user_id: int) -> List[Tuple[int, str, str]]:
+        """Candidate wrong answers for a user, reused for DISTRACTOR_POOL_TTL seconds"""
+        with self._pool_lock:
+            cached = self._pool_cache.get(user_id)
+            if cached and time.monotonic() - cached[0] < DISTRACTOR_POOL_TTL:
+                self._pool_cache.move_to_end(user_id)
+                return cached[1]
+
+        # One more than the 50 candidates used, so excluding the word being asked still leaves 50;
+        # a random subset per refresh lets the whole vocabulary take turns as distractors
+        pool = [
+            tuple(row)
+            for row in db.query(UserWord.id, UserWord.dutch_word, UserWord.english_translation)
+            .filter(UserWord.user_id == user_id, UserWord.is_active == True)
+            .order_by(func.random())
+            .limit(51)
+            .all()
+        ]
+        with self._pool_lock:
+            self._pool_cache[user_id] = (time.monotonic(), pool)
+            self._pool_cache.move_to_end(user_id)
+            while len(self._pool_cache) > self.max_cached_users:
+                self._pool_cache.popitem(last=False)
+        return pool
+
+    def invalidate_distractor_pool(self, user_id: int):
+        """Drop a user's cached distractors after their vocabulary changes"""
+        with self._pool_lock:
+            self._pool_cache.pop(user_id, None)
+
     def _generate_translation(self, word: UserWord, direction: str) -> Dict[str, Any]:
         if direction == "en_to_nl":
             question = f"Translate to Dutch: '{word.english_translation}'\n\nType your answer:"
@@ -89,23 +135,25 @@ class ExerciseManager:
         else:
             correct_answer = word.english_translation
 
-        # For multiple choice, exact match
-        if exercise_type.startswith("multiple_choice"):
-            return user_answer.strip().lower() == correct_answer.strip().lower()
+        return self.check_answer_text(correct_answer, exercise_type, user_answer)
 
-        # For translation, more flexible matching
+    def check_answer_text(self, correct_answer: str, exercise_type: str, user_answer: str) -> bool:
+        """Check an answer against the exercise's correct answer, without needing the UserWord row"""
+        # Normalize both sides once; every comparison below works on the cleaned strings
         user_clean = user_answer.strip().lower()
         correct_clean = correct_answer.strip().lower()
 
-        # Exact match
+        # Exact match (the only check for multiple choice)
         if user_clean == correct_clean:
             return True
+        if exercise_type.startswith("multiple_choice"):
+            return False
 
         # Handle articles (de/het) for Dutch
         if exercise_type == "translation_en_to_nl":
             # Remove articles for comparison
-            user_no_article = user_clean.replace("de ", "").replace("het ", "")
-            correct_no_article = correct_clean.replace("de ", "").replace("het ", "")
+            user_no_article = ARTICLE_PATTERN.sub("", user_clean, count=1)
+            correct_no_article = ARTICLE_PATTERN.sub("", correct_clean, count=1)
             if user_no_article == correct_no_article:
                 return True
 
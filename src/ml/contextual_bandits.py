@@ -5,8 +5,10 @@ This module selects optimal exercise types based on user performance patterns.
 """
 
 import json
+import random
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Dict
+from typing import Any, Dict, Optional, Sequence, Tuple
 
 import numpy as np
 from sklearn.linear_model import LogisticRegression
@@ -32,6 +34,17 @@ class ContextualBandits:
             "translation_en_to_nl",
             "translation_nl_to_en",
         ]
+        # Selection weights per exercise type (same order) while no model is trained: multiple choice 3x as likely
+        self.untrained_weights = [3, 3, 1, 1]
+        self.max_samples = 200  # Sliding window of recent rewards each model is trained on
+        self.retrain_every = 10  # New rewards a model collects between refits
+        self.max_cached_models = 1000  # (user_id, exercise_type) pairs kept in memory, least recently used dropped
+        # Reward samples per (user_id, exercise_type), accumulated in memory until there are enough to train;
+        # ordered from least to most recently updated
+        self.samples: "OrderedDict[Tuple[int, str], Dict[str, Any]]" = OrderedDict()
+        # Fitted models per (user_id, exercise_type), warm-started from their last solution on each refit;
+        # evicted together with their samples
+        self.models: Dict[Tuple[int, str], LogisticRegression] = {}
 
     def get_context_features(self, data_service: MLDataService, user_id: int, user_word_id: int) -> np.ndarray:
         """Get context features for bandit decision"""
@@ -48,18 +61,26 @@ class ContextualBandits:
 
     def select_exercise(self, data_service: MLDataService, user_id: int, user_word_id: int) -> str:
         """Select best exercise type using epsilon-greedy strategy"""
+        return self.select_exercise_with_context(data_service, user_id, user_word_id)[0]
+
+    def select_exercise_with_context(
+        self, data_service: MLDataService, user_id: int, user_word_id: int
+    ) -> Tuple[str, np.ndarray]:
+        """Select an exercise type and also return the context it was chosen in, for update_reward"""
         context = self.get_context_features(data_service, user_id, user_word_id)
 
         # Epsilon-greedy exploration
-        if np.random.random() < self.epsilon:
-            return np.random.choice(self.exercise_types)
+        if random.random() < self.epsilon:
+            return random.choice(self.exercise_types), context
 
         # Exploit: choose exercise type with highest predicted reward
         best_exercise = None
         best_reward = -np.inf
 
+        # Fetch every exercise type's model in one query
+        models_data = data_service.bandit_repo.load_models_data(user_id, self.exercise_types)
         for exercise_type in self.exercise_types:
-            model_data = data_service.bandit_repo.load_model_data(user_id, exercise_type)
+            model_data = models_data.get(exercise_type)
             if model_data and model_data["is_trained"]:
                 try:
                     predicted_reward = self._predict_reward(context, model_data)
@@ -73,34 +94,17 @@ class ContextualBandits:
         # If no model is trained or prediction failed, prefer multiple choice exercises
         if best_exercise is None:
             # Bias towards multiple choice exercises when models aren't trained
-            weighted_types = (
-                ["multiple_choice_en_to_nl"] * 3
-                + ["multiple_choice_nl_to_en"] * 3
-                + ["translation_en_to_nl"]
-                + ["translation_nl_to_en"]
-            )
-            best_exercise = np.random.choice(weighted_types)
+            best_exercise = random.choices(self.exercise_types, weights=self.untrained_weights)[0]
 
-        return best_exercise
+        return best_exercise, context
 
     def _predict_reward(self, context: np.ndarray, model_data: Dict) -> float:
         """Predict reward using stored model parameters"""
-        # Create and configure model from stored parameters
-        model = LogisticRegression(random_state=42, max_iter=1000)
-        model.coef_ = np.array(model_data["coefficients"]).reshape(1, -1)
-        model.intercept_ = np.array([model_data["intercept"]])
-        model.classes_ = np.array([0, 1])  # Binary classification
-
-        # Create scaler from stored parameters
-        scaler = StandardScaler()
-        scaler.mean_ = np.array(model_data["scaler_mean"])
-        scaler.scale_ = np.array(model_data["scaler_scale"])
+        # Same result as StandardScaler.transform + LogisticRegression.predict_proba, without building either
+        context_scaled = (context - model_data["scaler_mean"]) / model_data["scaler_scale"]
+        z = context_scaled @ model_data["coefficients"] + model_data["intercept"]
 
-        # Scale context and predict
-        context_scaled = scaler.transform(context.reshape(1, -1))
-        predicted_reward = model.predict_proba(context_scaled)[0][1]  # Probability of positive reward
-
-        return predicted_reward
+        return float(1.0 / (1.0 + np.exp(-z)))  # Probability of positive reward
 
     def update_reward(
         self,
@@ -109,34 +113,46 @@ class ContextualBandits:
         user_word_id: int,
         exercise_type: str,
         is_correct: bool,
-        response_time: float,
+        response_time: Optional[float],
+        context: Optional[Sequence[float]] = None,
     ):
-        """Update bandit model with reward feedback"""
-        context = self.get_context_features(data_service, user_id, user_word_id)
+        """Update bandit model with reward feedback, reusing the selection-time context when given"""
+        if context is None:
+            context = self.get_context_features(data_service, user_id, user_word_id)
+        else:
+            context = np.asarray(context, dtype=float)
 
         # Calculate reward based on correctness and response time
         base_reward = 1.0 if is_correct else 0.0  # Binary reward for LogisticRegression
-        time_bonus = max(0, (20 - response_time) / 20)  # Bonus for faster responses
+        # Bonus for faster responses (none when the response time is unknown)
+        time_bonus = max(0, (20 - response_time) / 20) if response_time is not None else 0.0
 
         # Binary classification: positive reward (1) vs negative reward (0)
         reward_label = 1 if (base_reward + 0.2 * time_bonus) > 0.5 else 0
 
-        # Get or create model data
-        model_data = data_service.bandit_repo.load_model_data(user_id, exercise_type)
-        if not model_data:
-            model_data = {"contexts": [], "rewards": [], "is_trained": False}
+        # Samples are kept in memory, so recording a reward needs no model SELECT
+        key = (user_id, exercise_type)
+        model_data = self.samples.get(key)
+        if model_data is None:
+            model_data = self.samples[key] = {
+                "contexts": deque(maxlen=self.max_samples),
+                "rewards": deque(maxlen=self.max_samples),
+                "new_samples": 0,  # Rewards added since the last refit
+            }
+            if len(self.samples) > self.max_cached_models:
+                evicted_key, _ = self.samples.popitem(last=False)
+                self.models.pop(evicted_key, None)
         else:
-            # Load existing contexts and rewards (we'll need to maintain them in memory)
-            # For now, we'll work with what we have and retrain when we reach threshold
-            model_data["contexts"] = model_data.get("contexts", [])
-            model_data["rewards"] = model_data.get("rewards", [])
+            self.samples.move_to_end(key)
 
         # Add new context and reward
         model_data["contexts"].append(context.tolist())
         model_data["rewards"].append(reward_label)
+        model_data["new_samples"] += 1
 
-        # Retrain model if we have enough data
-        if len(model_data["contexts"]) >= 10:  # Lower threshold for per-user models
+        # Retrain model once enough data and enough new rewards have arrived
+        if len(model_data["contexts"]) >= 10 and model_data["new_samples"] >= self.retrain_every:
+            model_data["new_samples"] = 0
             self._train_and_save_model(data_service, user_id, exercise_type, model_data)
 
     def _train_and_save_model(self, data_service: MLDataService, user_id: int, exercise_type: str, model_data: Dict):
@@ -147,9 +163,17 @@ class ContextualBandits:
         X = np.array(model_data["contexts"])
         y = np.array(model_data["rewards"])
 
+        # LogisticRegression needs both reward labels; wait for a window that has them
+        if len(np.unique(y)) < 2:
+            return
+
         try:
-            # Create and train model
-            model = LogisticRegression(random_state=42, max_iter=1000)
+            # Reuse the previous fit as the solver's starting point, so a refit after one new sample is a few iterations
+            model = self.models.get((user_id, exercise_type))
+            if model is None:
+                model = self.models[(user_id, exercise_type)] = LogisticRegression(
+                    random_state=42, max_iter=1000, warm_start=True
+                )
             scaler = StandardScaler()
 
             # Scale features and train
@@ -175,15 +199,10 @@ class ContextualBandits:
     def get_exercise_performance(self, data_service: MLDataService, user_id: int) -> Dict[str, float]:
         """Get performance statistics for each exercise type"""
         performance = {}
+        counts = data_service.session_repo.get_accuracy_by_exercise_type(user_id)
 
         for exercise_type in self.exercise_types:
-            sessions = data_service.session_repo.get_exercise_type_sessions(user_id, exercise_type)
-
-            if sessions:
-                correct_sessions = [s for s in sessions if s.is_correct]
-                accuracy = len(correct_sessions) / len(sessions)
-                performance[exercise_type] = accuracy
-            else:
-                performance[exercise_type] = 0.0
+            total, correct = counts.get(exercise_type, (0, 0))
+            performance[exercise_type] = correct / total if total else 0.0
 
         return performance
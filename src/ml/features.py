@@ -5,16 +5,22 @@ This module provides functions to extract features from user words and learning
 removing duplication between different ML models.
 """
 
+import re
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
 
 import numpy as np
 
 from data.models import LearningSession, UserWord
 
+# Accented letters in either case; the regex scans the word in C instead of a per-character Python loop
+SPECIAL_CHARS_PATTERN = re.compile("[áàäéèëíìïóòöúùüñç]", re.IGNORECASE)
+NUMBER_WORDS = frozenset(["one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten"])
 
-@dataclass
+
+@dataclass(frozen=True)
 class WordFeatures:
     """Word-specific features"""
 
@@ -50,95 +56,70 @@ class UserFeatures:
 
 def calculate_word_difficulty(word: UserWord) -> float:
     """Calculate word difficulty based on word properties"""
-    difficulty = 0.0
+    return _analyze_word(word.dutch_word, word.english_translation).difficulty
+
+
+def extract_word_features(word: UserWord) -> WordFeatures:
+    """Extract features from a UserWord object"""
+    if not word:
+        return _analyze_word(None, None)
+    return _analyze_word(word.dutch_word, word.english_translation)
+
+
+@lru_cache(maxsize=100_000)
+def _analyze_word(dutch_word: Optional[str], english_translation: Optional[str]) -> WordFeatures:
+    """Word features (difficulty included) in one pass over the text; memoized since word text never changes"""
+    if not dutch_word:
+        return WordFeatures(
+            length=0,
+            difficulty=0.5,
+            has_article=False,
+            is_compound=False,
+            has_special_chars=False,
+            is_verb=False,
+            is_number=False,
+        )
+
+    word_length = len(dutch_word)
+    has_article = dutch_word.startswith(("de ", "het "))
+    is_compound = len(dutch_word.split()) > 1
+    has_special_chars = SPECIAL_CHARS_PATTERN.search(dutch_word) is not None
 
-    if not word.dutch_word:
-        return 0.5
+    # Infer word type from patterns
+    is_verb = english_translation and english_translation.startswith("to ")
+    is_number = english_translation and english_translation in NUMBER_WORDS
 
     # Base difficulty from word length (0.1 - 0.5)
-    word_length = len(word.dutch_word)
-    length_factor = min(0.5, word_length * 0.03)
-    difficulty += length_factor
+    difficulty = 0.0
+    difficulty += min(0.5, word_length * 0.03)
 
     # Add difficulty for Dutch articles (de/het adds complexity)
-    if word.dutch_word.startswith("de ") or word.dutch_word.startswith("het "):
+    if has_article:
         difficulty += 0.2
 
     # Add difficulty for compound words (multiple words)
-    if len(word.dutch_word.split()) > 1:
+    if is_compound:
         difficulty += 0.15
 
     # Add difficulty for words with special characters
-    special_chars = set("áàäéèëíìïóòöúùüñç")
-    if any(char.lower() in special_chars for char in word.dutch_word):
+    if has_special_chars:
         difficulty += 0.1
 
     # Infer part of speech and add complexity
-    if word.english_translation:
+    if english_translation:
         # Simple heuristics for part of speech inference
-        if word.english_translation.startswith("to "):
+        if is_verb:
             difficulty += 0.2  # verb
-        elif word.dutch_word.startswith(("de ", "het ", "een ")):
+        elif dutch_word.startswith(("de ", "het ", "een ")):
             difficulty += 0.1  # noun
-        elif word.english_translation in [
-            "one",
-            "two",
-            "three",
-            "four",
-            "five",
-            "six",
-            "seven",
-            "eight",
-            "nine",
-            "ten",
-        ]:
+        elif is_number:
             difficulty += 0.05  # number
         else:
             difficulty += 0.1  # default (adjective/adverb/etc)
 
-    # Normalize to 0-1 range
-    return min(1.0, difficulty)
-
-
-def extract_word_features(word: UserWord) -> WordFeatures:
-    """Extract features from a UserWord object"""
-    if not word or not word.dutch_word:
-        return WordFeatures(
-            length=0,
-            difficulty=0.5,
-            has_article=False,
-            is_compound=False,
-            has_special_chars=False,
-            is_verb=False,
-            is_number=False,
-        )
-
-    word_length = len(word.dutch_word)
-    word_difficulty = calculate_word_difficulty(word)
-
-    # Additional word features
-    has_article = word.dutch_word.startswith("de ") or word.dutch_word.startswith("het ")
-    is_compound = len(word.dutch_word.split()) > 1
-    has_special_chars = any(char.lower() in "áàäéèëíìïóòöúùüñç" for char in word.dutch_word)
-
-    # Infer word type from patterns
-    is_verb = word.english_translation and word.english_translation.startswith("to ")
-    is_number = word.english_translation and word.english_translation in [
-        "one",
-        "two",
-        "three",
-        "four",
-        "five",
-        "six",
-        "seven",
-        "eight",
-        "nine",
-        "ten",
-    ]
-
     return WordFeatures(
         length=word_length,
-        difficulty=word_difficulty,
+        difficulty=min(1.0, difficulty),  # Normalize to 0-1 range
         has_article=has_article,
         is_compound=is_compound,
         has_special_chars=has_special_chars,
@@ -160,25 +141,38 @@ def extract_session_features(sessions: List[LearningSession]) -> SessionFeatures
             exercise_diversity=0,
         )
 
+    # One pass collects correctness, response times and exercise types together
+    correct_sessions = 0
+    timed_sessions = 0
+    response_time_total = 0.0
+    exercise_types = set()
+    for s in sessions:
+        if s.is_correct:
+            correct_sessions += 1
+        if s.response_time:
+            timed_sessions += 1
+            response_time_total += s.response_time
+        exercise_types.add(s.exercise_type)
+
     total_sessions = len(sessions)
-    correct_sessions = sum(1 for s in sessions if s.is_correct)
-    accuracy = correct_sessions / total_sessions if total_sessions > 0 else 0
+    accuracy = correct_sessions / total_sessions
 
-    # Calculate average response time
-    response_times = [s.response_time for s in sessions if s.response_time]
-    avg_response_time = np.mean(response_times) if response_times else 10.0
+    # Calculate average response time (a plain division; np.mean costs more than the sum for short lists)
+    avg_response_time = response_time_total / timed_sessions if timed_sessions else 10.0
 
     # Calculate time features
     now = datetime.utcnow()
     days_since_first = (now - sessions[0].timestamp).days
     days_since_last = (now - sessions[-1].timestamp).days
 
-    # Recent performance (last 5 sessions)
-    recent_sessions = sessions[-5:] if len(sessions) >= 5 else sessions
-    recent_accuracy = sum(1 for s in recent_sessions if s.is_correct) / len(recent_sessions)
+    # Recent performance (last 5 sessions); a plain counter, as NumPy setup outweighs a 5-item reduction
+    recent_correct = 0
+    for s in sessions[-5:]:
+        if s.is_correct:
+            recent_correct += 1
+    recent_accuracy = recent_correct / min(total_sessions, 5)
 
     # Exercise type diversity
-    exercise_types = set(s.exercise_type for s in sessions)
     exercise_diversity = len(exercise_types)
 
     return SessionFeatures(
@@ -207,11 +201,13 @@ def extract_user_features(user_sessions: List[LearningSession]) -> UserFeatures:
     return UserFeatures(global_accuracy=global_accuracy, hour_of_day=hour_of_day)
 
 
-def combine_features_for_progress_prediction(
-    word_features: WordFeatures, session_features: SessionFeatures, user_features: UserFeatures
-) -> np.ndarray:
-    """Combine all features for learning progress prediction"""
-    features = [
+# Width of the vector built by combine_features_for_progress_prediction
+PROGRESS_FEATURE_COUNT = 15
+
+
+def word_feature_values(word_features: WordFeatures) -> Tuple[float, ...]:
+    """The 7 word columns that lead every progress feature row"""
+    return (
         word_features.length,
         word_features.difficulty,
         int(word_features.has_article),
@@ -219,6 +215,19 @@ def combine_features_for_progress_prediction(
         int(word_features.has_special_chars),
         int(word_features.is_verb),
         int(word_features.is_number),
+    )
+
+
+def combine_features_for_progress_prediction(
+    word_features: WordFeatures,
+    session_features: SessionFeatures,
+    user_features: UserFeatures,
+) -> np.ndarray:
+    """Combine all features for learning progress prediction"""
+    # Written into a preallocated row of the known width instead of converting a list and reshaping it
+    row = np.empty((1, PROGRESS_FEATURE_COUNT))
+    row[0] = (
+        *word_feature_values(word_features),
         session_features.total_sessions,
         session_features.accuracy,
         session_features.avg_response_time,
@@ -227,9 +236,62 @@ def combine_features_for_progress_prediction(
         session_features.recent_accuracy,
         session_features.exercise_diversity,
         user_features.global_accuracy,
-    ]
+    )
+
+    return row
+
+
+def extract_session_features_batch(session_lists: Sequence[List[LearningSession]]) -> np.ndarray:
+    """Session features for many words at once: one row per session list, columns in SessionFeatures order"""
+    n = len(session_lists)
+    counts = np.fromiter((len(sessions) for sessions in session_lists), dtype=np.int64, count=n)
+
+    # Defaults for words without sessions, as in extract_session_features
+    features = np.zeros((n, 7))
+    features[:, 2] = 10.0
+    seen = counts > 0
+    if not seen.any():
+        return features
+
+    # Flatten every list into parallel columns; word[k] is the row that session k belongs to
+    sessions = [session for word_sessions in session_lists for session in word_sessions]
+    total = len(sessions)
+    word = np.repeat(np.arange(n), counts)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    is_correct = np.fromiter((bool(s.is_correct) for s in sessions), dtype=float, count=total)
+    response_time = np.fromiter((s.response_time or 0.0 for s in sessions), dtype=float, count=total)
+
+    correct = np.bincount(word, weights=is_correct, minlength=n)
+    features[seen, 0] = counts[seen]
+    features[seen, 1] = correct[seen] / counts[seen]
+
+    # Average over sessions that have a response time; others keep the 10s default
+    timed = np.bincount(word, weights=response_time != 0, minlength=n)
+    timed_sum = np.bincount(word, weights=response_time, minlength=n)
+    has_timed = timed > 0
+    features[has_timed, 2] = timed_sum[has_timed] / timed[has_timed]
+
+    # Sessions are oldest first, so the first and last of each run give the time features;
+    # whole days are floor-divided against one shared "now" instead of building a timedelta per word
+    now = np.datetime64(datetime.utcnow(), "us")
+    one_day = np.timedelta64(1, "D")
+    first_seen = np.array([sessions[j].timestamp for j in starts[seen]], dtype="datetime64[us]")
+    last_seen = np.array([sessions[j - 1].timestamp for j in ends[seen]], dtype="datetime64[us]")
+    features[seen, 3] = (now - first_seen) // one_day
+    features[seen, 4] = (now - last_seen) // one_day
+
+    # Recent performance over each word's last 5 sessions
+    position = np.arange(total) - np.repeat(starts, counts)
+    recent = position >= np.repeat(counts - 5, counts)
+    recent_correct = np.bincount(word, weights=is_correct * recent, minlength=n)
+    features[seen, 5] = recent_correct[seen] / np.minimum(counts[seen], 5)
+
+    # Exercise type diversity
+    word_types = set(zip(word.tolist(), (s.exercise_type for s in sessions)))
+    features[:, 6] = np.bincount([i for i, _ in word_types], minlength=n)
 
-    return np.array(features).reshape(1, -1)
+    return features
 
 
 def combine_features_for_contextual_bandits(
@@ -4,7 +4,9 @@ Learning Progress Predictor using Logistic Regression.
 This module predicts word mastery levels based on user performance patterns.
 """
 
-from typing import Optional
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 from sklearn.linear_model import LogisticRegression
@@ -12,10 +14,13 @@ from sklearn.preprocessing import StandardScaler
 
 from data.repositories import MLDataService
 from ml.features import (
+    PROGRESS_FEATURE_COUNT,
     combine_features_for_progress_prediction,
     extract_session_features,
+    extract_session_features_batch,
     extract_user_features,
     extract_word_features,
+    word_feature_values,
 )
 
 
@@ -23,9 +28,16 @@ class LearningProgressPredictor:
     """Predicts learning progress using logistic regression"""
 
     def __init__(self):
-        self.model = LogisticRegression(random_state=42, max_iter=1000)
-        self.scaler = StandardScaler()
-        self.is_trained = False
+        self.max_cached_models = 1000  # Users whose fitted model is kept in memory, least recently used dropped
+        # Last fitted model per user (None for the global model); each retrain warm-starts a new
+        # model from it, so a cached model is never refitted in place
+        self.models: Dict[Optional[int], LogisticRegression] = {}
+        self.is_trained = False  # True once any model has been fitted
+        # user_id -> (coef, intercept, scaler mean, 1 / scaler scale) of that user's last fit,
+        # ordered from least to most recently used; evicting a user also drops their model
+        self._params: "OrderedDict[Optional[int], Tuple[np.ndarray, float, np.ndarray, np.ndarray]]" = OrderedDict()
+        # Retrains run on executor threads, so the two caches are updated under a lock
+        self._cache_lock = threading.Lock()
 
     def extract_features(self, data_service: MLDataService, user_id: int, user_word_id: int) -> Optional[np.ndarray]:
         """Extract features for a single word prediction"""
@@ -33,12 +45,34 @@ class LearningProgressPredictor:
         if not prediction_data:
             return None
 
-        word_features = extract_word_features(prediction_data["user_word"])
-        session_features = extract_session_features(prediction_data["word_sessions"])
-        user_features = extract_user_features(prediction_data["user_sessions"])
+        return self._features_from_data(prediction_data)
+
+    def _features_from_data(self, data_point: Dict[str, Any]) -> np.ndarray:
+        """Build the (1, F) feature row for one word's prediction or training data"""
+        word_features = extract_word_features(data_point["user_word"])
+        session_features = extract_session_features(data_point["word_sessions"])
+        user_features = extract_user_features(data_point["user_sessions"])
 
         return combine_features_for_progress_prediction(word_features, session_features, user_features)
 
+    def build_feature_matrix(self, data_points: List[Dict[str, Any]]) -> np.ndarray:
+        """Stack the features of many words into one (N, F) matrix for a single scaler/model pass"""
+        # Same columns as combine_features_for_progress_prediction: word (7), session (7), user (1)
+        X = np.empty((len(data_points), PROGRESS_FEATURE_COUNT))
+        X[:, 7:14] = extract_session_features_batch([data_point["word_sessions"] for data_point in data_points])
+
+        # Data points of one user share the same session list, so its global features are computed once
+        user_accuracy: Dict[int, float] = {}
+        for i, data_point in enumerate(data_points):
+            X[i, :7] = word_feature_values(extract_word_features(data_point["user_word"]))
+
+            user_sessions = data_point["user_sessions"]
+            if id(user_sessions) not in user_accuracy:
+                user_accuracy[id(user_sessions)] = extract_user_features(user_sessions).global_accuracy
+            X[i, 14] = user_accuracy[id(user_sessions)]
+
+        return X
+
     def train_model(self, data_service: MLDataService, user_id: Optional[int] = None) -> bool:
         """Train the model on user data"""
         training_data = data_service.get_word_training_data(user_id)
@@ -46,20 +80,8 @@ class LearningProgressPredictor:
         if len(training_data) < 5:  # Lower threshold since we train per user
             return False
 
-        features_list = []
-        targets = []
-
-        for data_point in training_data:
-            word_features = extract_word_features(data_point["user_word"])
-            session_features = extract_session_features(data_point["word_sessions"])
-            user_features = extract_user_features(data_point["user_sessions"])
-
-            features = combine_features_for_progress_prediction(word_features, session_features, user_features)
-            features_list.append(features.flatten())
-            targets.append(data_point["target"])
-
-        X = np.array(features_list)
-        y = np.array(targets)
+        X = self.build_feature_matrix(training_data)
+        y = np.fromiter((data_point["target"] for data_point in training_data), dtype=int, count=len(training_data))
 
         # Check if we have both classes (0 and 1) for binary classification
         unique_classes = np.unique(y)
@@ -67,14 +89,59 @@ class LearningProgressPredictor:
             return False  # Cannot train with only one class
 
         # Scale features
-        X_scaled = self.scaler.fit_transform(X)
-
-        # Train model
-        self.model.fit(X_scaled, y)
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+
+        # Train a fresh model seeded with the user's previous fit, so two retrains of the same user
+        # never fit one shared estimator concurrently
+        model = LogisticRegression(random_state=42, max_iter=1000, warm_start=True)
+        with self._cache_lock:
+            previous = self.models.get(user_id)
+            if previous is not None:
+                model.coef_ = previous.coef_.copy()
+                model.intercept_ = previous.intercept_.copy()
+        model.fit(X_scaled, y)
+        self._store_model(user_id, model, (
+            model.coef_[0].copy(),
+            float(model.intercept_[0]),
+            scaler.mean_.copy(),
+            1.0 / scaler.scale_,
+        ))
         self.is_trained = True
 
         return True
 
+    def _store_model(
+        self,
+        user_id: Optional[int],
+        model: LogisticRegression,
+        params: Tuple[np.ndarray, float, np.ndarray, np.ndarray],
+    ):
+        """Cache a user's fitted model and parameters, evicting the least recently used users beyond the limit"""
+        with self._cache_lock:
+            self.models[user_id] = model
+            self._params[user_id] = params
+            self._params.move_to_end(user_id)
+            while len(self._params) > self.max_cached_models:
+                evicted_user_id, _ = self._params.popitem(last=False)
+                self.models.pop(evicted_user_id, None)
+
+    def _get_params(self, user_id: int) -> Optional[Tuple[np.ndarray, float, np.ndarray, np.ndarray]]:
+        """Fitted parameters for a user, falling back to the global model"""
+        with self._cache_lock:
+            for key in (user_id, None):
+                params = self._params.get(key)
+                if params is not None:
+                    self._params.move_to_end(key)
+                    return params
+        return None
+
+    def _predict_rows(self, X: np.ndarray, params: Tuple[np.ndarray, float, np.ndarray, np.ndarray]) -> np.ndarray:
+        """Probability of mastery (class 1) for each feature row, computed directly from the fitted parameters"""
+        # Same standardization as StandardScaler.transform, without its input validation and copy
+        coef, intercept, mean, inv_scale = params
+        return 1.0 / (1.0 + np.exp(-(((X - mean) * inv_scale) @ coef + intercept)))
+
     def predict_mastery(self, data_service: MLDataService, user_id: int, user_word_id: int) -> float:
         """Predict mastery level for a specific word"""
         prediction_data = data_service.get_word_prediction_data(user_id, user_word_id)
@@ -85,18 +152,12 @@ class LearningProgressPredictor:
         if prediction_data["user_word"].times_seen == 0:
             return 0.0  # New words get 0 prediction
 
-        if not self.is_trained:
+        params = self._get_params(user_id)
+        if params is None:
             return 0.0  # Default for untrained model
 
-        features = self.extract_features(data_service, user_id, user_word_id)
-        if features is None:
-            return 0.0
-
-        features_scaled = self.scaler.transform(features)
-
         # Get probability of being mastered (class 1)
-        prediction_proba = self.model.predict_proba(features_scaled)[0][1]
-        return prediction_proba
+        return float(self._predict_rows(self._features_from_data(prediction_data), params)[0])
 
     def update_progress_and_retrain(
         self, data_service: MLDataService, user_id: int, user_word_id: int, response_time: Optional[float]
@@ -112,19 +173,33 @@ class LearningProgressPredictor:
         # Apply predictions to all user words
         self.apply_predictions_to_user_words(data_service, user_id)
 
+        # One commit covers the response time and every mastery update
+        data_service.commit()
+
     def apply_predictions_to_user_words(self, data_service: MLDataService, user_id: int):
         """Apply ML predictions to all user words after training"""
-        if not self.is_trained:
+        params = self._get_params(user_id)
+        if params is None:
             return
 
         user_words = data_service.user_word_repo.get_all_user_words(user_id)
-        predictions = {}
 
+        # Only seen words get an ML prediction (new words stay at 0)
+        word_ids = []
+        data_points = []
         for user_word in user_words:
             if user_word.times_seen > 0:
-                # Get ML prediction for this word
-                predicted_mastery = self.predict_mastery(data_service, user_id, user_word.id)
-                predictions[user_word.id] = predicted_mastery
+                prediction_data = data_service.get_word_prediction_data(user_id, user_word.id)
+                if prediction_data:
+                    word_ids.append(user_word.id)
+                    data_points.append(prediction_data)
+
+        if not data_points:
+            return
+
+        # Predict every word in one pass instead of one call per word
+        probabilities = self._predict_rows(self.build_feature_matrix(data_points), params)
+        predictions = dict(zip(word_ids, probabilities.tolist()))
 
         # Apply all predictions in batch
         data_service.apply_mastery_predictions(user_id, predictions)
@@ -1,10 +1,11 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
-from sqlalchemy import and_
+from sqlalchemy import and_, case, func
 from sqlalchemy.orm import Session
 
 from data.models import LearningSession, User, UserWord
+from data.repositories import UserRepository
 
 
 class SpacedRepetitionManager:
@@ -21,53 +22,70 @@ class SpacedRepetitionManager:
     def get_next_word_for_review(
         self, db: Session, user_telegram_id: int, progress_predictor=None
     ) -> Optional[UserWord]:
-        user = db.query(User).filter(User.telegram_id == user_telegram_id).first()
-        if not user:
-            return None
-        due_words: list[UserWord] = self._get_due_words(db, user.id)
-        if due_words:
-            return due_words[0]
-        return None
-
-    def _get_due_words(self, db: Session, user_id: int) -> list[UserWord]:
-        # Get user words that are due for review (including those with null review dates)
-        due_words = (
+        # Resolve the user and pick the highest-priority word in a single query
+        return (
+            self._due_words_query(db)
+            .join(User, User.id == UserWord.user_id)
+            .filter(User.telegram_id == user_telegram_id)
+            .first()
+        )
+
+    def _due_words_query(self, db: Session):
+        # User words that are due for review (including those with null review dates), most urgent first
+        return (
             db.query(UserWord)
-            .filter(
-                and_(
-                    UserWord.user_id == user_id,
-                    UserWord.is_active == True,
-                )
-            )
+            .filter(UserWord.is_active == True)
             .order_by(UserWord.next_review_date.nulls_first(), UserWord.mastery_level.nulls_first())
-            .all()
         )
 
-        return due_words
+    def update_word_schedule(self, db: Session, user_telegram_id: int, user_word_id: int, is_correct: bool) -> bool:
+        """Apply an SM-2 step to a user word; returns False if the user does not own such a word"""
+        # Fetch the word and check its owner in a single round trip
+        user_word = (
+            db.query(UserWord)
+            .join(User, User.id == UserWord.user_id)
+            .filter(and_(UserWord.id == user_word_id, User.telegram_id == user_telegram_id))
+            .first()
+        )
+        if not user_word:
+            return False
 
-    def update_word_schedule(self, db: Session, user_telegram_id: int, user_word_id: int, is_correct: bool):
-        user = db.query(User).filter(User.telegram_id == user_telegram_id).first()
-        if not user:
-            return
+        self.update_word_schedule_obj(db, user_word, is_correct)
+        return True
 
-        # Get the user word
-        user_word = db.query(UserWord).filter(UserWord.id == user_word_id).first()
-        if not user_word:
-            return
+    def update_word_schedule_obj(self, db: Session, user_word: UserWord, is_correct: bool):
+        """Apply an SM-2 step to an already loaded user word (changes are committed by the caller)"""
+        # The previous interval is only needed once the initial intervals are used up
+        prev_interval = 1
+        if is_correct and user_word.repetition_count + 1 > len(self.initial_intervals):
+            prev_interval = self._get_previous_interval(db, user_word.user_id, user_word.id)
 
         # Calculate new schedule using SM-2 algorithm
-        repetition_count = user_word.repetition_count + 1
-        ease_factor = user_word.ease_factor
+        repetition_count, ease_factor, interval_days = self.calculate_schedule(
+            user_word.repetition_count, user_word.ease_factor, is_correct, prev_interval
+        )
+
+        # Update the user word with new schedule; one timestamp serves both the schedule and last_seen
+        now = datetime.utcnow()
+        user_word.next_review_date = now + timedelta(days=interval_days)
+        user_word.repetition_count = repetition_count
+        user_word.ease_factor = ease_factor
+
+        # Update user word progress (committed by the caller together with the session record)
+        self._update_user_word_progress(db, user_word, is_correct, now)
+
+    def calculate_schedule(
+        self, repetition_count: int, ease_factor: float, is_correct: bool, prev_interval: int = 1
+    ) -> Tuple[int, float, int]:
+        """SM-2 step: return the new (repetition_count, ease_factor, interval_days), without DB access"""
+        repetition_count += 1
 
         if is_correct:
             # Correct answer - increase interval
-            if repetition_count == 1:
-                interval_days = self.initial_intervals[0]
-            elif repetition_count == 2:
-                interval_days = self.initial_intervals[1]
+            if repetition_count <= len(self.initial_intervals):
+                interval_days = self.initial_intervals[repetition_count - 1]
             else:
                 # Calculate interval based on previous interval and ease factor
-                prev_interval = self._get_previous_interval(db, user.id, user_word_id)
                 interval_days = max(1, int(prev_interval * ease_factor))
 
             # Adjust ease factor for correct answer
@@ -79,70 +97,53 @@ class SpacedRepetitionManager:
             interval_days = 1
             ease_factor = max(self.min_ease_factor, ease_factor - self.ease_factor_penalty)
 
-        # Update the user word with new schedule
-        next_review_date = datetime.utcnow() + timedelta(days=interval_days)
-        user_word.next_review_date = next_review_date
-        user_word.repetition_count = repetition_count
-        user_word.ease_factor = ease_factor
-
-        # Update user word progress
-        self._update_user_word_progress(db, user_word, is_correct)
-
-        db.commit()
+        return repetition_count, ease_factor, interval_days
 
     def _get_previous_interval(self, db: Session, user_id: int, user_word_id: int) -> int:
-        # Get the two most recent sessions to calculate previous interval
-        sessions = (
-            db.query(LearningSession)
+        # Get the timestamps of the two most recent sessions to calculate previous interval
+        timestamps = (
+            db.query(LearningSession.timestamp)
             .filter(and_(LearningSession.user_id == user_id, LearningSession.user_word_id == user_word_id))
             .order_by(LearningSession.timestamp.desc())
             .limit(2)
             .all()
         )
 
-        if len(sessions) < 2:
+        if len(timestamps) < 2:
             return 1
 
-        time_diff = sessions[0].timestamp - sessions[1].timestamp
+        time_diff = timestamps[0].timestamp - timestamps[1].timestamp
         return max(1, time_diff.days)
 
-    def _update_user_word_progress(self, db: Session, user_word: UserWord, is_correct: bool):
+    def _update_user_word_progress(
+        self, db: Session, user_word: UserWord, is_correct: bool, now: Optional[datetime] = None
+    ):
         # Update progress tracking fields
         user_word.times_seen += 1
         if is_correct:
             user_word.times_correct += 1
-        user_word.last_seen = datetime.utcnow()
+        user_word.last_seen = now or datetime.utcnow()
 
         # Calculate new mastery level
         accuracy = user_word.times_correct / user_word.times_seen if user_word.times_seen > 0 else 0
         user_word.mastery_level = min(1.0, accuracy * (user_word.times_seen / 10))  # Scale by frequency
 
     def get_review_stats(self, db: Session, user_telegram_id: int) -> dict:
-        user = db.query(User).filter(User.telegram_id == user_telegram_id).first()
+        user = UserRepository(db).get_by_telegram_id(user_telegram_id)
         if not user:
             return {}
 
         now = datetime.utcnow()
 
-        # Count due words
-        due_count = (
-            db.query(UserWord)
-            .filter(and_(UserWord.user_id == user.id, UserWord.is_active == True, UserWord.next_review_date <= now))
-            .count()
-        )
-
-        # Count new words available
-        new_count = (
-            db.query(UserWord)
-            .filter(and_(UserWord.user_id == user.id, UserWord.is_active == True, UserWord.times_seen == 0))
-            .count()
-        )
-
-        # Count total words in progress
-        total_learning = (
-            db.query(UserWord)
-            .filter(and_(UserWord.user_id == user.id, UserWord.is_active == True, UserWord.times_seen > 0))
-            .count()
+        # Count due, new and in-progress words in one pass over the user's active words
+        due_count, new_count, total_learning = (
+            db.query(
+                func.count(case((UserWord.next_review_date <= now, 1))),
+                func.count(case((UserWord.times_seen == 0, 1))),
+                func.count(case((UserWord.times_seen > 0, 1))),
+            )
+            .filter(and_(UserWord.user_id == user.id, UserWord.is_active == True))
+            .one()
         )
 
         return {"due_for_review": due_count, "new_words_available": new_count, "total_words_learning": total_learning}
@@ -1,132 +1,158 @@
-from typing import Dict
+from typing import Dict, List
 
+from sqlalchemy import and_, bindparam, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from data.models import User, UserWord, create_tables
+from data.repositories import UserRepository
+
+# INSERT constructs supporting ON CONFLICT DO NOTHING, by dialect name
+CONFLICT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+# Dutch word -> English translation for every new user; a dict, so each Dutch word appears once
+DEFAULT_WORDS = {
+    # Common words
+    "de auto": "car",
+    "de fiets": "bicycle",
+    "het station": "station",
+    # Verbs
+    "slapen": "to sleep",
+    # Complex words
+    "de regering": "government",
+    "de maatschappij": "society",
+    "de geschiedenis": "history",
+    "de wetenschap": "science",
+    "de ontwikkeling": "development",
+    "de verandering": "change",
+    "de mogelijkheid": "possibility",
+    # Colors
+    "rood": "red",
+    # Time
+    "de tijd": "time",
+    # Weather
+    "het weer": "weather",
+}
+
+
+def _default_word_rows(user_id) -> List[Dict]:
+    """The default words as user_words rows for a user ID (a value or a bind parameter)"""
+    return [
+        {
+            "user_id": user_id,
+            "dutch_word": dutch_word,
+            "english_translation": english_translation,
+            "word_length": len(dutch_word),
+        }
+        for dutch_word, english_translation in DEFAULT_WORDS.items()
+    ]
 
 
-class VocabularyLoader:
-    def __init__(self):
-        self.default_words = [
-            # Common words
-            {"dutch": "de auto", "english": "car"},
-            {"dutch": "de fiets", "english": "bicycle"},
-            {"dutch": "het station", "english": "station"},
-            # Verbs
-            {"dutch": "slapen", "english": "to sleep"},
-            # Complex words
-            {"dutch": "de regering", "english": "government"},
-            {"dutch": "de maatschappij", "english": "society"},
-            {"dutch": "de geschiedenis", "english": "history"},
-            {"dutch": "de wetenschap", "english": "science"},
-            {"dutch": "de ontwikkeling", "english": "development"},
-            {"dutch": "de verandering", "english": "change"},
-            {"dutch": "de mogelijkheid", "english": "possibility"},
-            # Colors
-            {"dutch": "rood", "english": "red"},
-            # Time
-            {"dutch": "de tijd", "english": "time"},
-            # Weather
-            {"dutch": "het weer", "english": "weather"},
-        ]
+# Default-vocabulary seed statements, built once per dialect; each call only binds user_id
+SEED_INSERTS = {
+    dialect_name: (
+        conflict_insert(UserWord.__table__).values(_default_word_rows(bindparam("user_id"))).on_conflict_do_nothing()
+    )
+    for dialect_name, conflict_insert in CONFLICT_INSERTS.items()
+}
+
 
+class VocabularyLoader:
     def add_word(self, db: Session, dutch_word: str, english_translation: str, user_telegram_id: int = None):
         if not user_telegram_id:
             return False, "User required for adding words"
 
-        user = db.query(User).filter(User.telegram_id == user_telegram_id).first()
-        if not user:
-            return False, "User not found"
-
-        # Check if user already has this word
-        existing_user_word = (
-            db.query(UserWord).filter(UserWord.user_id == user.id, UserWord.dutch_word == dutch_word).first()
+        # Resolve the user and check if they already have this word in one query
+        # (only the IDs and active flag are needed, not whole rows)
+        row = (
+            db.query(User.id, UserWord.id, UserWord.is_active)
+            .outerjoin(UserWord, and_(UserWord.user_id == User.id, UserWord.dutch_word == dutch_word))
+            .filter(User.telegram_id == user_telegram_id)
+            .first()
         )
+        if not row:
+            return False, "User not found"
+        user_id, user_word_id, is_active = row
 
-        if existing_user_word:
-            if existing_user_word.is_active:
+        # Each branch commits right after its own write; the read-only duplicate branch never commits
+        if user_word_id:
+            if is_active:
                 return False, "Word already in your vocabulary"
-            else:
-                # Reactivate the word
-                existing_user_word.is_active = True
-                db.commit()
-                return True, "Word reactivated in your vocabulary"
-        else:
-            # Add new word to user's vocabulary
-            user_word = UserWord(
-                user_id=user.id,
-                dutch_word=dutch_word,
-                english_translation=english_translation,
-                word_length=len(dutch_word),
-            )
-            db.add(user_word)
 
-        db.commit()
+            # Reactivate the word
+            db.execute(update(UserWord).where(UserWord.id == user_word_id).values(is_active=True))
+            db.commit()
+            return True, "Word reactivated in your vocabulary"
+
+        # Add new word to user's vocabulary
+        user_word = UserWord(
+            user_id=user_id,
+            dutch_word=dutch_word,
+            english_translation=english_translation,
+            word_length=len(dutch_word),
+        )
+        db.add(user_word)
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent request added the same word first; the unique (user_id, dutch_word) index kept one
+            db.rollback()
+            return False, "Word already in your vocabulary"
         return True, "Word added successfully"
 
     def add_default_vocabulary_for_user(self, db: Session, user_telegram_id: int):
         """Add default vocabulary to a specific user"""
-        user = db.query(User).filter(User.telegram_id == user_telegram_id).first()
-        if not user:
+        user_id = db.query(User.id).filter(User.telegram_id == user_telegram_id).scalar()
+        if not user_id:
             return False, "User not found"
 
-        added_count = 0
-        for word_data in self.default_words:
-            # Check if user already has this word
-            existing_user_word = (
-                db.query(UserWord)
-                .filter(UserWord.user_id == user.id, UserWord.dutch_word == word_data["dutch"])
-                .first()
-            )
-
-            if not existing_user_word:
-                user_word = UserWord(
-                    user_id=user.id,
-                    dutch_word=word_data["dutch"],
-                    english_translation=word_data["english"],
-                    word_length=len(word_data["dutch"]),
-                )
-                db.add(user_word)
-                added_count += 1
-
+        added_count = self._seed_default_vocabulary(db, user_id)
         db.commit()
         return True, f"Added {added_count} words to your vocabulary"
 
+    def _seed_default_vocabulary(self, db: Session, user_id: int) -> int:
+        """Insert the default words the user is missing (without committing); returns the number added"""
+        seed_insert = SEED_INSERTS.get(db.get_bind().dialect.name)
+        if seed_insert is not None:
+            # A single INSERT; the unique (user_id, dutch_word) index skips words the user already has,
+            # and rowcount of a single execute is the number of rows actually added
+            return db.execute(seed_insert, {"user_id": user_id}).rowcount
+
+        # Other databases: one query finds the words the user already has, one INSERT adds the rest
+        existing_words = {
+            dutch_word for (dutch_word,) in db.query(UserWord.dutch_word).filter(
+                UserWord.user_id == user_id,
+                UserWord.dutch_word.in_(list(DEFAULT_WORDS)),
+            )
+        }
+        new_words = [word for word in _default_word_rows(user_id) if word["dutch_word"] not in existing_words]
+        if new_words:
+            db.execute(insert(UserWord), new_words)
+        return len(new_words)
+
     def get_word_stats(self, db: Session, user_telegram_id: int = None) -> Dict:
+        # Count and word length stats in a single pass, read back as a plain tuple;
+        # global across all users unless a user is given
+        stats_query = select(
+            func.count(UserWord.id),
+            func.avg(UserWord.word_length),
+            func.min(UserWord.word_length),
+            func.max(UserWord.word_length),
+        )
         if user_telegram_id:
-            user = db.query(User).filter(User.telegram_id == user_telegram_id).first()
-            if user:
-                total_words = db.query(UserWord).filter(UserWord.user_id == user.id).count()
-                # Count by word length categories
-                from sqlalchemy import func
-
-                length_stats = (
-                    db.query(
-                        func.avg(UserWord.word_length).label("avg_length"),
-                        func.min(UserWord.word_length).label("min_length"),
-                        func.max(UserWord.word_length).label("max_length"),
-                    )
-                    .filter(UserWord.user_id == user.id)
-                    .first()
-                )
-            else:
+            user = UserRepository(db).get_by_telegram_id(user_telegram_id)
+            if not user:
                 return {"error": "User not found"}
-        else:
-            # Global stats across all users
-            total_words = db.query(UserWord).count()
-            from sqlalchemy import func
-
-            length_stats = db.query(
-                func.avg(UserWord.word_length).label("avg_length"),
-                func.min(UserWord.word_length).label("min_length"),
-                func.max(UserWord.word_length).label("max_length"),
-            ).first()
+            stats_query = stats_query.where(UserWord.user_id == user.id)
 
+        total_words, avg_length, min_length, max_length = db.execute(stats_query).one()
         return {
             "total_words": total_words,
-            "avg_word_length": float(length_stats.avg_length) if length_stats.avg_length else 0,
-            "min_word_length": length_stats.min_length or 0,
-            "max_word_length": length_stats.max_length or 0,
+            "avg_word_length": float(avg_length) if avg_length else 0,
+            "min_word_length": min_length or 0,
+            "max_word_length": max_length or 0,
         }
 
 